@@ -1,10 +1,8 @@
-import csv
 import secrets
-import tempfile
 import uuid
+from datetime import datetime
 from datetime import timedelta
 
-from flask import Response
 from flask import abort
 from flask import request
 from flask_jwt_extended import create_access_token
@@ -14,6 +12,7 @@ from flask_restplus import inputs
 from flask_restplus import reqparse
 from peewee import fn
 
+from core import NEXT_CURSOR_HEADER
 from core import AuditDownloadInputSchema
 from core import AuditInputSchema
 from core import AuditListInputSchema
@@ -22,16 +21,18 @@ from core import AuditTable
 from core import AuditTokenInputSchema
 from core import AuditUpdateSchema
 from core import Authorizer
-from core import ContactSchema
 from core import ContactTable
 from core import ResultTable
 from core import ScanInputSchema
 from core import Scanner
 from core import ScanResource
 from core import ScanTable
+from core import ScanValidationInputSchema
 from core import Utils
+from core import Validators
 from core import VulnTable
 from core import db
+from core import password_lockout
 
 from .scan import ScanOutputModel
 
@@ -76,6 +77,7 @@ class AuditList(AuditResource):
     AuditListGetParser.add_argument("keyword", type=str, location="args")
     AuditListGetParser.add_argument("page", type=int, default=1, location="args")
     AuditListGetParser.add_argument("count", type=int, default=10, location="args")
+    AuditListGetParser.add_argument("cursor", type=str, location="args")
 
     AuditListPostInputModel = api.model(
         "AuditListPostInput",
@@ -96,44 +98,58 @@ class AuditList(AuditResource):
         if errors:
             abort(400, errors)
 
-        audit_query = AuditTable.select(
-            AuditTable,
-            fn.GROUP_CONCAT(
-                ContactTable.name.distinct(),
-                ContactSchema.SEPARATER_NAME_EMAIL,
-                ContactTable.email,
-                python_value=(
-                    lambda contacts: [
-                        dict(zip(["name", "email"], contact.rsplit(ContactSchema.SEPARATER_NAME_EMAIL)))
-                        for contact in contacts.split(ContactSchema.SEPARATER_CONTACTS)
-                    ]
-                ),
-            ).alias("contacts"),
-        ).join(ContactTable, on=(AuditTable.id == ContactTable.audit_id))
+        page = AuditResource.get_many(AuditList.get_page_query(params), withContacts=True)
+
+        headers = {}
+        if len(page) == params["count"]:
+            # Cursor of the next page, which is returned as an alternative to the page number
+            last = page[-1]
+            headers[NEXT_CURSOR_HEADER] = Utils.encode_cursor([last["updated_at"].isoformat(), last["id"]])
+
+        return page, 200, headers
+
+    @staticmethod
+    def get_page_query(params):
+        # Audits of the page are found by seeking the index of `updated_at`
+        contact_query = ContactTable.select(ContactTable.id).where(ContactTable.audit_id == AuditTable.id)
+        page_query = AuditTable.select().where(fn.EXISTS(contact_query))
 
         if "unsafe_only" in params and params["unsafe_only"] == True:
-            audit_query = (
-                audit_query.join(ScanTable, on=(AuditTable.id == ScanTable.audit_id))
+            unsafe_query = (
+                ScanTable.select(ScanTable.id)
                 .join(ResultTable, on=(ScanTable.id == ResultTable.scan_id))
                 .join(VulnTable, on=(ResultTable.oid == VulnTable.oid))
+                .where(ScanTable.audit_id == AuditTable.id)
                 .where(VulnTable.fix_required == "REQUIRED")
                 .where(ScanTable.comment == "")
             )
+            page_query = page_query.where(fn.EXISTS(unsafe_query))
 
         if "keyword" in params and len(params["keyword"]) > 0:
-            audit_query = audit_query.where(
+            page_query = page_query.where(
                 (AuditTable.name ** "%{}%".format(params["keyword"]))
                 | (AuditTable.description ** "%{}%".format(params["keyword"]))
             )
         if "submitted" in params:
-            audit_query = audit_query.where(AuditTable.submitted == params["submitted"])
+            page_query = page_query.where(AuditTable.submitted == params["submitted"])
         if "approved" in params:
-            audit_query = audit_query.where(AuditTable.approved == params["approved"])
-        audit_query = audit_query.group_by(AuditTable.id)
-        audit_query = audit_query.order_by(AuditTable.updated_at.desc())
-        audit_query = audit_query.paginate(params["page"], params["count"])
-
-        return list(audit_query.dicts())
+            page_query = page_query.where(AuditTable.approved == params["approved"])
+        page_query = page_query.order_by(AuditTable.updated_at.desc(), AuditTable.id.desc())
+
+        if "cursor" in params:
+            try:
+                updated_at, audit_id = Utils.decode_cursor(params["cursor"])
+                updated_at = datetime.fromisoformat(updated_at)
+                audit_id = int(audit_id)
+            except (TypeError, ValueError):
+                abort(400, {"cursor": ["Given cursor is invalid."]})
+            page_query = page_query.where(
+                (AuditTable.updated_at < updated_at)
+                | ((AuditTable.updated_at == updated_at) & (AuditTable.id < audit_id))
+            ).limit(params["count"])
+        else:
+            page_query = page_query.paginate(params["page"], params["count"])
+        return page_query
 
     @api.expect(AuditListPostInputModel)
     @api.marshal_with(AuditOutputModel)
@@ -174,6 +190,7 @@ class AuditToken(AuditResource):
     @api.response(401, "Invalid Password")
     @api.response(403, "Invalid Source IP")
     @api.response(404, "Not Found")
+    @api.response(429, "Too Many Failed Password Attempts")
     def post(self, audit_uuid):
         """Publish an API token for the specified audit"""
         audit = AuditResource.get_by_id(audit_uuid=audit_uuid, withContacts=False, withScans=False)
@@ -187,8 +204,14 @@ class AuditToken(AuditResource):
             if errors:
                 abort(400, errors)
 
+            # Refuse guesses before hashing, so that brute-force attempts cannot burn CPU on PBKDF2
+            if password_lockout.is_locked(audit["id"]):
+                abort(429, "Too many failed password attempts, try again later")
+
             if Utils.get_password_hash(params["password"]) != audit["password"]:
+                password_lockout.fail(audit["id"])
                 abort(401, "Invalid password")
+            password_lockout.reset(audit["id"])
 
         token = create_access_token(identity={"scope": audit_uuid, "restricted": False})
         return {"token": token}, 200
@@ -277,24 +300,30 @@ class AuditItem(AuditResource):
 
         with db.database.atomic():
             if params != {}:
-                AuditTable.update(params).where(AuditTable.id == audit["id"]).execute()
+                AuditResource.update(audit["id"], params)
 
             if len(contacts) > 0:
                 for contact in contacts:
                     contact["audit_id"] = audit["id"]
                 ContactTable.delete().where(ContactTable.audit_id == audit["id"]).execute()
                 ContactTable.insert_many(contacts).execute()
+                AuditResource.invalidate(audit_id=audit["id"])
 
         return AuditResource.get_by_id(audit_uuid=audit["uuid"], withContacts=True, withScans=True)
 
     @Authorizer.admin_token_required
     def delete(self, audit_uuid):
         """Delete the specified audit"""
-        audit_query = AuditTable.delete().where(AuditTable.uuid == audit_uuid)
-        if audit_query.execute() == 0:
-            abort(404, "Not Found")
-        else:
-            return {}
+        audit = AuditResource.get_by_id(audit_uuid=audit_uuid)
+        with db.database.atomic():
+            # Scans are deleted along with the audit, so detach their results first
+            scan_query = ScanTable.select(ScanTable.id).where(ScanTable.audit_id == audit["id"])
+            ScanResource.detach_results([scan["id"] for scan in scan_query.dicts()])
+            if AuditTable.delete().where(AuditTable.id == audit["id"]).execute() == 0:
+                abort(404, "Not Found")
+
+        AuditResource.invalidate(audit_uuid=audit_uuid)
+        return {}
 
 
 @api.route("/<string:audit_uuid>/submit/")
@@ -322,7 +351,7 @@ class AuditSubmission(AuditResource):
         params, _errors = schema.load({"submitted": True, "rejected_reason": ""})
 
         with db.database.atomic():
-            AuditTable.update(params).where(AuditTable.id == audit["id"]).execute()
+            AuditResource.update(audit["id"], params)
 
         return AuditResource.get_by_id(audit_uuid=audit["uuid"], withContacts=True, withScans=True)
 
@@ -347,7 +376,7 @@ class AuditSubmission(AuditResource):
             abort(400, errors)
 
         with db.database.atomic():
-            AuditTable.update(params).where(AuditTable.id == audit["id"]).execute()
+            AuditResource.update(audit["id"], params)
 
         return AuditResource.get_by_id(audit_uuid=audit["uuid"], withContacts=True, withScans=True)
 
@@ -371,7 +400,7 @@ class AuditApproval(AuditResource):
         params, _errors = schema.load({"approved": True, "submitted": True})
 
         with db.database.atomic():
-            AuditTable.update(params).where(AuditTable.id == audit["id"]).execute()
+            AuditResource.update(audit["id"], params)
 
         return AuditResource.get_by_id(audit_uuid=audit["uuid"], withContacts=True, withScans=True)
 
@@ -388,7 +417,7 @@ class AuditApproval(AuditResource):
         params, _errors = schema.load({"approved": False})
 
         with db.database.atomic():
-            AuditTable.update(params).where(AuditTable.id == audit["id"]).execute()
+            AuditResource.update(audit["id"], params)
 
         return AuditResource.get_by_id(audit_uuid=audit["uuid"], withContacts=True, withScans=True)
 
@@ -416,6 +445,7 @@ class AuditDownload(AuditResource):
         "comment",
         "advice",
     ]
+    RESULT_BATCH_SIZE = 1000
 
     @Authorizer.token_required
     def get(self, audit_uuid):
@@ -429,35 +459,55 @@ class AuditDownload(AuditResource):
         audit_query = AuditTable.select().where(AuditTable.uuid == audit_uuid)
 
         audit = audit_query.dicts()[0]
-        output = audit["name"] + "\n" + audit["description"] + "\n\n"
-
-        scan_ids = []
-        for scan in audit_query[0].scans.dicts():
-            if scan["processed"] is True:
-                scan_ids.append(scan["id"])
+        preamble = audit["name"] + "\n" + audit["description"] + "\n\n"
+
+        scan_ids = [scan["id"] for scan in AuditDownload.get_scan_query(audit["id"]).dicts()]
+
+        def get_rows():
+            # mysqlclient buffers a whole result set, so results are read in batches seeking past the last one
+            after = None
+            while True:
+                results = list(AuditDownload.get_result_query(scan_ids, after).dicts())
+                for result in results:
+                    result["started_at"] = result["started_at"] + timedelta(minutes=params["tz_offset"])
+                    result["ended_at"] = result["ended_at"] + timedelta(minutes=params["tz_offset"])
+                    result["description"] = Utils.format_openvas_description(result["description"])
+                    yield result
+                if len(results) < AuditDownload.RESULT_BATCH_SIZE:
+                    break
+                after = (results[-1]["scan_id"], results[-1]["result_id"])
+
+        return Utils.get_csv_response(get_rows(), AuditDownload.AUDIT_CSV_COLUMNS, preamble=preamble)
+
+    @staticmethod
+    def get_scan_query(audit_id):
+        return ScanTable.select(ScanTable.id).where(
+            (ScanTable.audit_id == audit_id) & (ScanTable.processed == True)
+        )
 
-        results = (
-            ResultTable.select(ResultTable, ScanTable, VulnTable)
+    @staticmethod
+    def get_result_query(scan_ids, after=None):
+        result_query = (
+            ResultTable.select(
+                ResultTable,
+                ResultTable.id.alias("result_id"),
+                ScanTable,
+                VulnTable.fix_required,
+                VulnTable.advice,
+            )
             .join(ScanTable)
             .join(VulnTable, on=(ResultTable.oid == VulnTable.oid))
             .where(ResultTable.scan_id.in_(scan_ids))
-            .order_by(ResultTable.scan_id)
+            .order_by(ResultTable.scan_id, ResultTable.id)
+            .limit(AuditDownload.RESULT_BATCH_SIZE)
         )
-
-        with tempfile.TemporaryFile("r+") as f:
-            writer = csv.DictWriter(f, AuditDownload.AUDIT_CSV_COLUMNS, extrasaction="ignore")
-            writer.writeheader()
-            for result in results.dicts():
-                result["started_at"] = result["started_at"] + timedelta(minutes=params["tz_offset"])
-                result["ended_at"] = result["ended_at"] + timedelta(minutes=params["tz_offset"])
-                result["description"] = Utils.format_openvas_description(result["description"])
-                writer.writerow(result)
-            f.flush()
-            f.seek(0)
-            output += f.read()
-
-        headers = {"Content-Type": "text/csv", "Content-Disposition": "attachment"}
-        return Response(response=output, status=200, headers=headers)
+        if after is not None:
+            scan_id, result_id = after
+            result_query = result_query.where(
+                (ResultTable.scan_id > scan_id)
+                | ((ResultTable.scan_id == scan_id) & (ResultTable.id > result_id))
+            )
+        return result_query
 
 
 @api.route("/<string:audit_uuid>/scan/")
@@ -478,6 +528,7 @@ class AuditScan(AuditResource):
                     "audit-approved",
                     "target-is-private-ip",
                     "could-not-resolve-target-fqdn",
+                    "target-resolution-timed-out",
                     "target-is-not-fqdn-or-ipv4",
                 ],
                 required=True,
@@ -507,4 +558,46 @@ class AuditScan(AuditResource):
 
         scan_insert_query = ScanTable(**params)
         scan_insert_query.save()
+        AuditResource.invalidate(audit_id=params["audit_id"])
         return ScanResource.get_by_uuid(scan_insert_query.uuid)
+
+
+@api.route("/<string:audit_uuid>/scan/validate/")
+@api.doc(security="API Token")
+@api.response(200, "Success")
+@api.response(401, "Invalid Token")
+@api.response(404, "Not Found")
+class AuditScanValidation(AuditResource):
+
+    ScanValidationInputModel = api.model(
+        "ScanValidationInput", {"targets": fields.List(fields.String(), required=True)}
+    )
+    ScanValidationOutputModel = api.model(
+        "ScanValidationOutput",
+        {
+            "target": fields.String(required=True),
+            "error_reason": fields.String(
+                enum=[
+                    "target-is-private-ip",
+                    "could-not-resolve-target-fqdn",
+                    "target-resolution-timed-out",
+                    "target-is-not-fqdn-or-ipv4",
+                ],
+                required=True,
+            ),
+        },
+    )
+
+    @api.expect(ScanValidationInputModel)
+    @api.marshal_with(ScanValidationOutputModel, as_list=True)
+    @api.response(400, "Bad Request")
+    @Authorizer.token_required
+    def post(self, audit_uuid):
+        """Validate scan targets in bulk, returning the targets which can not be registered"""
+        schema = ScanValidationInputSchema()
+        params, errors = schema.load(request.json)
+        if errors:
+            abort(400, errors)
+
+        errors = Validators.validate_targets(params["targets"])
+        return [{"target": target, "error_reason": messages[0]} for target, messages in errors.items()]
@@ -4,6 +4,7 @@ from flask_restplus import Namespace
 from flask_restplus import Resource
 from flask_restplus import fields
 
+from core import AuditResource
 from core import Authorizer
 from core import PendingTask
 from core import ScanResource
@@ -88,11 +89,14 @@ class ScanItem(Resource):
     @ScanResource.reject_if_submitted_or_approved
     def delete(self, scan_uuid):
         """Delete the specified scan"""
-        scan_query = ScanTable.delete().where(ScanTable.uuid == scan_uuid)
-        if scan_query.execute() == 0:
-            abort(404, "Not Found")
-        else:
-            return {}
+        scan = ScanResource.get_by_uuid(scan_uuid, withResults=False)
+        with db.database.atomic():
+            ScanResource.detach_results([scan["id"]])
+            if ScanTable.delete().where(ScanTable.id == scan["id"]).execute() == 0:
+                abort(404, "Not Found")
+
+        AuditResource.invalidate(audit_uuid=scan_uuid[0:24] + "0" * 8)
+        return {}
 
 
 @api.route("/<string:scan_uuid>/schedule/")
@@ -1,8 +1,5 @@
-import csv
-import tempfile
 from datetime import timedelta
 
-from flask import Response
 from flask import abort
 from flask import request
 from flask_restplus import Namespace
@@ -10,8 +7,8 @@ from flask_restplus import Resource
 from flask_restplus import fields
 from flask_restplus import reqparse
 
+from core import NEXT_CURSOR_HEADER
 from core import Authorizer
-from core import ResultTable
 from core import Utils
 from core import VulnListInputSchema
 from core import VulnTable
@@ -30,6 +27,9 @@ VulnOutputModel = api.model(
         "cve": fields.String(required=True),
         "description": fields.String(required=True),
         "advice": fields.String(required=True),
+        "occurrences": fields.Integer(required=True),
+        "first_seen_at": fields.DateTime(required=True),
+        "last_seen_at": fields.DateTime(required=True),
     },
 )
 
@@ -46,6 +46,7 @@ class VulneravilityList(Resource):
     VulnListGetParser.add_argument("keyword", type=str, location="args")
     VulnListGetParser.add_argument("page", type=int, location="args")
     VulnListGetParser.add_argument("count", type=int, location="args")
+    VulnListGetParser.add_argument("cursor", type=str, location="args")
 
     @api.expect(VulnListGetParser)
     @api.marshal_with(VulnOutputModel, as_list=True)
@@ -57,15 +58,31 @@ class VulneravilityList(Resource):
         if errors:
             abort(400, errors)
 
+        response = []
+        for vulnerability in VulneravilityList.get_page_query(params).dicts():
+            response.append(vulnerability)
+
+        headers = {}
+        if len(response) == params["count"]:
+            # Cursor of the next page, which is returned as an alternative to the page number
+            headers[NEXT_CURSOR_HEADER] = Utils.encode_cursor([response[-1]["oid"]])
+
+        return response, 200, headers
+
+    @staticmethod
+    def get_page_query(params):
         vuln_query = VulnTable.select(
             VulnTable.oid,
             VulnTable.fix_required,
             VulnTable.advice,
-            ResultTable.name,
-            ResultTable.cvss_base,
-            ResultTable.cve,
-            ResultTable.description,
-        ).join(ResultTable, on=(VulnTable.oid == ResultTable.oid))
+            VulnTable.name,
+            VulnTable.cvss_base,
+            VulnTable.cve,
+            VulnTable.description,
+            VulnTable.occurrences,
+            VulnTable.first_seen_at,
+            VulnTable.last_seen_at,
+        ).where(VulnTable.occurrences > 0)
 
         if "fix_required" in params and len(params["fix_required"]) > 0:
             vuln_query = vuln_query.where(VulnTable.fix_required == params["fix_required"])
@@ -73,25 +90,19 @@ class VulneravilityList(Resource):
         if "keyword" in params and len(params["keyword"]) > 0:
             vuln_query = vuln_query.where(
                 (VulnTable.oid ** "%{}%".format(params["keyword"]))
-                | (ResultTable.name ** "%{}%".format(params["keyword"]))
+                | (VulnTable.name ** "%{}%".format(params["keyword"]))
             )
-        vuln_query = vuln_query.group_by(
-            VulnTable.oid,
-            VulnTable.fix_required,
-            VulnTable.advice,
-            ResultTable.name,
-            ResultTable.cvss_base,
-            ResultTable.cve,
-            ResultTable.description,
-        )
         vuln_query = vuln_query.order_by(VulnTable.oid.desc())
-        vuln_query = vuln_query.paginate(params["page"], params["count"])
 
-        response = []
-        for vulnerability in vuln_query.dicts():
-            response.append(vulnerability)
-
-        return response
+        if "cursor" in params:
+            try:
+                (oid,) = Utils.decode_cursor(params["cursor"])
+            except ValueError:
+                abort(400, {"cursor": ["Given cursor is invalid."]})
+            vuln_query = vuln_query.where(VulnTable.oid < oid).limit(params["count"])
+        else:
+            vuln_query = vuln_query.paginate(params["page"], params["count"])
+        return vuln_query
 
 
 @api.route("/download/")
@@ -109,9 +120,13 @@ class VulneravilityListDownload(Resource):
         "cvss_base",
         "description",
         "advice",
+        "occurrences",
+        "first_seen_at",
+        "last_seen_at",
         "created_at",
         "updated_at",
     ]
+    VULN_BATCH_SIZE = 1000
 
     VulnListDownloadParser = reqparse.RequestParser()
     VulnListDownloadParser.add_argument("fix_required", type=str, location="args")
@@ -126,17 +141,40 @@ class VulneravilityListDownload(Resource):
         if errors:
             abort(400, errors)
 
+        def get_rows():
+            # mysqlclient buffers a whole result set, so vulnerabilities are read in batches seeking by OID
+            before = None
+            while True:
+                vulns = list(VulneravilityListDownload.get_vuln_query(params, before).dicts())
+                for vuln in vulns:
+                    vuln["description"] = Utils.format_openvas_description(vuln["description"])
+                    vuln["created_at"] = vuln["created_at"] + timedelta(minutes=params["tz_offset"])
+                    vuln["updated_at"] = vuln["updated_at"] + timedelta(minutes=params["tz_offset"])
+                    vuln["first_seen_at"] = vuln["first_seen_at"] + timedelta(minutes=params["tz_offset"])
+                    vuln["last_seen_at"] = vuln["last_seen_at"] + timedelta(minutes=params["tz_offset"])
+                    yield vuln
+                if len(vulns) < VulneravilityListDownload.VULN_BATCH_SIZE:
+                    break
+                before = vulns[-1]["oid"]
+
+        return Utils.get_csv_response(get_rows(), VulneravilityListDownload.VULNERABILITY_CSV_COLUMNS)
+
+    @staticmethod
+    def get_vuln_query(params, before=None):
         vuln_query = VulnTable.select(
             VulnTable.oid,
             VulnTable.fix_required,
             VulnTable.advice,
             VulnTable.created_at,
             VulnTable.updated_at,
-            ResultTable.name,
-            ResultTable.cvss_base,
-            ResultTable.cve,
-            ResultTable.description,
-        ).join(ResultTable, on=(VulnTable.oid == ResultTable.oid))
+            VulnTable.name,
+            VulnTable.cvss_base,
+            VulnTable.cve,
+            VulnTable.description,
+            VulnTable.occurrences,
+            VulnTable.first_seen_at,
+            VulnTable.last_seen_at,
+        ).where(VulnTable.occurrences > 0)
 
         if "fix_required" in params and len(params["fix_required"]) > 0:
             vuln_query = vuln_query.where(VulnTable.fix_required == params["fix_required"])
@@ -144,38 +182,11 @@ class VulneravilityListDownload(Resource):
         if "keyword" in params and len(params["keyword"]) > 0:
             vuln_query = vuln_query.where(
                 (VulnTable.oid ** "%{}%".format(params["keyword"]))
-                | (ResultTable.name ** "%{}%".format(params["keyword"]))
-            )
-        vuln_query = vuln_query.group_by(
-            VulnTable.oid,
-            VulnTable.fix_required,
-            VulnTable.advice,
-            VulnTable.created_at,
-            VulnTable.updated_at,
-            ResultTable.name,
-            ResultTable.cvss_base,
-            ResultTable.cve,
-            ResultTable.description,
-        )
-        vuln_query = vuln_query.order_by(VulnTable.oid.desc())
-        output = ""
-
-        with tempfile.TemporaryFile("r+") as f:
-            writer = csv.DictWriter(
-                f, VulneravilityListDownload.VULNERABILITY_CSV_COLUMNS, extrasaction="ignore"
+                | (VulnTable.name ** "%{}%".format(params["keyword"]))
             )
-            writer.writeheader()
-            for vuln in vuln_query.dicts():
-                vuln["description"] = Utils.format_openvas_description(vuln["description"])
-                vuln["created_at"] = vuln["created_at"] + timedelta(minutes=params["tz_offset"])
-                vuln["updated_at"] = vuln["updated_at"] + timedelta(minutes=params["tz_offset"])
-                writer.writerow(vuln)
-            f.flush()
-            f.seek(0)
-            output += f.read()
-
-        headers = {"Content-Type": "text/csv", "Content-Disposition": "attachment"}
-        return Response(response=output, status=200, headers=headers)
+        if before is not None:
+            vuln_query = vuln_query.where(VulnTable.oid < before)
+        return vuln_query.order_by(VulnTable.oid.desc()).limit(VulneravilityListDownload.VULN_BATCH_SIZE)
 
 
 @api.route("/<string:oid>/")
@@ -8,10 +8,12 @@ from flask_cors import CORS
 from peewee import MySQLDatabase
 
 from apis import api
+from core import NEXT_CURSOR_HEADER
 from core import AuditTable
 from core import ContactTable
 from core import ResultTable
 from core import ScanTable
+from core import SlackMessageTable
 from core import TaskTable
 from core import Utils
 from core import VulnTable
@@ -73,6 +75,7 @@ else:
 
 app.config["ADMIN_PASSWORD"] = os.getenv("ADMIN_PASSWORD", "admin-password")
 app.config["PERMITTED_SOURCE_IP_RANGES"] = os.getenv("PERMITTED_SOURCE_IP_RANGES", "")
+Utils.get_ip_range_table(app.config["PERMITTED_SOURCE_IP_RANGES"])  # Fail fast on invalid ranges
 app.config["CORS_PERMITTED_ORIGINS"] = os.getenv("CORS_PERMITTED_ORIGINS", "*")
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "super-secret")
 app.config["JWT_ACCESS_TOKEN_EXPIRES"] = 3 * 3600  # 3 hours
@@ -87,10 +90,12 @@ db.init_app(app)
 jwt.init_app(app)
 jwt._set_error_handler_callbacks(api)
 marshmallow.init_app(app)
-CORS(app, origins=app.config["CORS_PERMITTED_ORIGINS"])
+CORS(app, origins=app.config["CORS_PERMITTED_ORIGINS"], expose_headers=[NEXT_CURSOR_HEADER])
 
 with db.database:
-    db.database.create_tables([AuditTable, ContactTable, ScanTable, TaskTable, VulnTable, ResultTable])
+    db.database.create_tables(
+        [AuditTable, ContactTable, ScanTable, TaskTable, VulnTable, ResultTable, SlackMessageTable]
+    )
 
 
 @app.after_request
@@ -2,22 +2,27 @@ import urllib3
 
 from .authorizers import Authorizer  # noqa
 from .authorizers import jwt  # noqa
+from .authorizers import password_lockout  # noqa
 from .models import AuditTable  # noqa
 from .models import ContactTable  # noqa
 from .models import ResultTable  # noqa
 from .models import ScanTable  # noqa
+from .models import SlackMessageTable  # noqa
 from .models import TaskTable  # noqa
 from .models import VulnTable  # noqa
 from .models import db  # noqa
+from .reingesters import ReportReingester  # noqa
 from .resources import AuditResource  # noqa
 from .resources import ScanResource  # noqa
 from .scanners import OpenVASScanner as Scanner  # noqa
+from .schedulers import TaskScheduler  # noqa
 from .tasks import DeletedTask  # noqa
 from .tasks import FailedTask  # noqa
 from .tasks import PendingTask  # noqa
 from .tasks import RunningTask  # noqa
 from .tasks import StoppedTask  # noqa
 from .utils import Utils  # noqa
+from .validators import NEXT_CURSOR_HEADER  # noqa
 from .validators import AuditDownloadInputSchema  # noqa
 from .validators import AuditInputSchema  # noqa
 from .validators import AuditListInputSchema  # noqa
@@ -27,6 +32,8 @@ from .validators import AuthInputSchema  # noqa
 from .validators import ContactSchema  # noqa
 from .validators import ScanInputSchema  # noqa
 from .validators import ScanUpdateSchema  # noqa
+from .validators import ScanValidationInputSchema  # noqa
+from .validators import Validators  # noqa
 from .validators import VulnListInputSchema  # noqa
 from .validators import VulnUpdateSchema  # noqa
 from .validators import marshmallow  # noqa
@@ -1,27 +1,125 @@
+import collections
+import hashlib
+import os
+import threading
+import time
 from functools import wraps
 
 from flask import abort
+from flask import request
 from flask_jwt_extended import JWTManager
 from flask_jwt_extended import get_jwt_identity
 from flask_jwt_extended import get_raw_jwt
 from flask_jwt_extended import verify_jwt_in_request
 
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "60"))
+PASSWORD_MAX_FAILURES = int(os.getenv("PASSWORD_MAX_FAILURES", "5"))
+PASSWORD_LOCKOUT_SECONDS = int(os.getenv("PASSWORD_LOCKOUT_SECONDS", "300"))
+
 jwt = JWTManager()
 
 
+class TokenCache:
+    """Bounded cache of verified tokens, keyed by the hash of the token so that tokens are not kept"""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+
+    def get(self, token):
+        key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        with self.lock:
+            if key not in self.entries:
+                return None
+            expires_at, identity, claims = self.entries[key]
+            if expires_at <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return identity, claims
+
+    def put(self, token, identity, claims):
+        if self.size <= 0 or self.ttl <= 0:
+            return
+
+        # Never outlive the expiration time of the token itself
+        expires_at = time.time() + self.ttl
+        if "exp" in claims:
+            expires_at = min(expires_at, claims["exp"])
+
+        key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        with self.lock:
+            self.entries[key] = (expires_at, identity, claims)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+class PasswordLockout:
+    """Locks out password attempts of a key, e.g. an audit, after repeated failures"""
+
+    def __init__(self, max_failures, lockout_seconds, size=10000):
+        self.max_failures = max_failures
+        self.lockout_seconds = lockout_seconds
+        self.size = size
+        self.lock = threading.Lock()
+        self.failures = collections.OrderedDict()
+
+    def is_locked(self, key):
+        with self.lock:
+            if key not in self.failures:
+                return False
+            count, last_failed_at = self.failures[key]
+            if last_failed_at + self.lockout_seconds <= time.time():
+                del self.failures[key]
+                return False
+            return count >= self.max_failures
+
+    def fail(self, key):
+        with self.lock:
+            count, _last_failed_at = self.failures.pop(key, (0, 0))
+            self.failures[key] = (count + 1, time.time())
+            while len(self.failures) > self.size:
+                self.failures.popitem(last=False)
+
+    def reset(self, key):
+        with self.lock:
+            self.failures.pop(key, None)
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+password_lockout = PasswordLockout(PASSWORD_MAX_FAILURES, PASSWORD_LOCKOUT_SECONDS)
+
+
+def verify_token():
+    # Signature and claims of the same token are verified only once while it is cached
+    token = request.headers.get("Authorization", "")
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+
+    try:
+        verify_jwt_in_request()
+        identity = get_jwt_identity()
+        claims = get_raw_jwt()
+    except:
+        abort(401, "Token is invalid")
+
+    token_cache.put(token, identity, claims)
+    return identity, claims
+
+
 class Authorizer:
     def token_required(f):
         @wraps(f)
         def decorate(*args, **kwargs):
-            try:
-                verify_jwt_in_request()
-                identity = get_jwt_identity()
-            except:
-                abort(401, "Token is invalid")
+            identity, claims = verify_token()
 
             if identity["restricted"] == False:
-                jwt = get_raw_jwt()
-                if "exp" not in jwt:
+                if "exp" not in claims:
                     abort(401, "Expiration time (exp) must be set if token type is NOT restricted")
 
             if "audit_uuid" in kwargs:
@@ -42,11 +140,7 @@ class Authorizer:
     def admin_token_required(f):
         @wraps(f)
         def decorate(*args, **kwargs):
-            try:
-                verify_jwt_in_request()
-                identity = get_jwt_identity()
-            except:
-                abort(401, "Token is invalid")
+            identity, _claims = verify_token()
             if identity["scope"] != "*":
                 abort(401, "Token is insufficient privileges")
             else:
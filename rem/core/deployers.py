@@ -1,10 +1,13 @@
 import json
 import os
+import threading
+import time
 import uuid
 from enum import Enum
 from enum import auto
 
 import kubernetes.client as k8s
+import kubernetes.watch as k8s_watch
 import requests
 from kubernetes.client.rest import ApiException
 
@@ -34,6 +37,10 @@ class Deployer:
     def is_ready(self):
         raise NotImplementedError()
 
+    @staticmethod
+    def refill_pool():
+        return
+
 
 class LocalDeployer(Deployer):
     def __init__(self, uid):
@@ -51,80 +58,344 @@ class LocalDeployer(Deployer):
         return True
 
 
+class KubernetesClientCache:
+
+    GCP_METADATA_API_TOKEN_ENDPOINT = (
+        "http://metadata.google.internal/computeMetadata/v1/instance/service-accounts/default/token"
+    )
+    TOKEN_REFRESH_MARGIN = 5 * 60
+    TOKEN_REFRESH_RETRY_INTERVAL = 10
+    TOKEN_REQUEST_TIMEOUT = 10
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.config = None
+        self.apps_api = None
+        self.core_api = None
+        self.expires_at = 0
+        self.refresh_timer = None
+
+    def get(self):
+        with self.lock:
+            if self.config is None:
+                self.config = k8s.Configuration()
+                self.config.host = os.getenv("KUBERNETES_MASTER_SERVER", "localhost")
+                self.config.verify_ssl = False
+                client = k8s.ApiClient(self.config)
+                self.apps_api = k8s.AppsV1Api(client)
+                self.core_api = k8s.CoreV1Api(client)
+            is_expiring = time.time() >= self.expires_at - KubernetesClientCache.TOKEN_REFRESH_MARGIN
+
+        if is_expiring:
+            # Background refresh has not run in time, so refresh the token synchronously
+            self._refresh_token()
+
+        return self.apps_api, self.core_api
+
+    def _refresh_in_background(self):
+        try:
+            self._refresh_token()
+        except Exception:
+            with self.lock:
+                self._schedule_refresh(KubernetesClientCache.TOKEN_REFRESH_RETRY_INTERVAL)
+
+    def _refresh_token(self):
+        # Fetched without holding the lock, so that a slow metadata server never blocks other callers
+        token, expires_in = self._get_credential()
+        with self.lock:
+            # The API client reads the configuration on every request, so the new token applies immediately
+            self.config.api_key["authorization"] = "Bearer " + token
+            self.expires_at = time.time() + expires_in
+            self._schedule_refresh(
+                max(
+                    expires_in - KubernetesClientCache.TOKEN_REFRESH_MARGIN,
+                    KubernetesClientCache.TOKEN_REFRESH_RETRY_INTERVAL,
+                )
+            )
+
+    def _schedule_refresh(self, delay):
+        if self.refresh_timer is not None:
+            self.refresh_timer.cancel()
+        self.refresh_timer = threading.Timer(delay, self._refresh_in_background)
+        self.refresh_timer.daemon = True
+        self.refresh_timer.start()
+
+    def _get_credential(self):
+        headers = {"Metadata-Flavor": "Google"}
+        res = requests.get(
+            KubernetesClientCache.GCP_METADATA_API_TOKEN_ENDPOINT,
+            headers=headers,
+            timeout=KubernetesClientCache.TOKEN_REQUEST_TIMEOUT,
+        )
+        credential = json.loads(res.text)
+        return credential["access_token"], credential["expires_in"]
+
+
+client_cache = KubernetesClientCache()
+
+
+class KubernetesInformer:
+
+    NAME_LABEL = "app.kubernetes.io/name"
+    WATCH_TIMEOUT = 5 * 60
+    WATCH_REQUEST_TIMEOUT = WATCH_TIMEOUT + 30  # Client side, in case the connection is left half-open
+    RETRY_INTERVAL = 10
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.namespace = None
+        self.deployments = {}
+        self.services = {}
+        self.synced = {"deployment": threading.Event(), "service": threading.Event()}
+        self.received_at = {"deployment": 0, "service": 0}
+
+    def start(self, namespace):
+        with self.lock:
+            if self.namespace is not None:
+                return
+            self.namespace = namespace
+
+        for kind in self.synced:
+            threading.Thread(target=self._run, args=(kind,), daemon=True).start()
+
+    def is_synced(self):
+        # Each watch ends by the server in WATCH_TIMEOUT and lists again, so a cache which has received
+        # nothing for longer has lost its watch
+        now = time.time()
+        return all(
+            [
+                synced.is_set() and now - self.received_at[kind] < KubernetesInformer.WATCH_REQUEST_TIMEOUT
+                for kind, synced in self.synced.items()
+            ]
+        )
+
+    def get(self, name):
+        with self.lock:
+            return self.deployments.get(name), self.services.get(name)
+
+    def list_deployments(self):
+        with self.lock:
+            return list(self.deployments.values())
+
+    def update(self, obj):
+        objects = self.deployments if isinstance(obj, k8s.V1Deployment) else self.services
+        with self.lock:
+            objects[obj.metadata.name] = obj
+
+    def remove(self, name):
+        with self.lock:
+            self.deployments.pop(name, None)
+            self.services.pop(name, None)
+
+    def _run(self, kind):
+        objects = self.deployments if kind == "deployment" else self.services
+
+        while True:
+            try:
+                apps_api, core_api = client_cache.get()
+                if kind == "deployment":
+                    list_func = apps_api.list_namespaced_deployment
+                else:
+                    list_func = core_api.list_namespaced_service
+
+                # List all scanners first, then follow changes from the listed version
+                result = list_func(self.namespace, label_selector=KubernetesInformer.NAME_LABEL)
+                with self.lock:
+                    objects.clear()
+                    for obj in result.items:
+                        if obj.metadata.name.startswith(Deployer.UID_PREFIX):
+                            objects[obj.metadata.name] = obj
+                self.received_at[kind] = time.time()
+                self.synced[kind].set()
+
+                stream = k8s_watch.Watch().stream(
+                    list_func,
+                    self.namespace,
+                    label_selector=KubernetesInformer.NAME_LABEL,
+                    resource_version=result.metadata.resource_version,
+                    timeout_seconds=KubernetesInformer.WATCH_TIMEOUT,
+                    _request_timeout=KubernetesInformer.WATCH_REQUEST_TIMEOUT,
+                )
+                for event in stream:
+                    self.received_at[kind] = time.time()
+                    if event["type"] == "ERROR":
+                        # Listed version is too old, so list again
+                        break
+                    obj = event["object"]
+                    if not obj.metadata.name.startswith(Deployer.UID_PREFIX):
+                        continue
+                    with self.lock:
+                        if event["type"] == "DELETED":
+                            objects.pop(obj.metadata.name, None)
+                        else:
+                            objects[obj.metadata.name] = obj
+
+            except Exception:
+                # Callers read from the API server directly until the cache is synced again
+                self.synced[kind].clear()
+                time.sleep(KubernetesInformer.RETRY_INTERVAL)
+
+
+informer = KubernetesInformer()
+
+
 class KubernetesDeployer(Deployer):
 
     OPENVAS_CONTAINER_IMAGE = "mikesplain/openvas:9"
     CONTAINER_USE_CPU_LIMIT = "400m"
     CONTAINER_USE_MEMORY_LIMIT = "4Gi"
     DEFAULT_SERVICE_PORT = 443
-    GCP_METADATA_API_TOKEN_ENDPOINT = (
-        "http://metadata.google.internal/computeMetadata/v1/instance/service-accounts/default/token"
-    )
+    WARM_POOL_SIZE = int(os.getenv("SCANNER_WARM_POOL_SIZE", "0"))
+    POOL_LABEL = "casval.io/pool"
 
     def __init__(self, uid):
         super().__init__(uid)
         self.namespace = os.getenv("KUBERNETES_NAMESPACE", "default")
-        self.client = self._client()
-        self.status, self.host, self.port = self._get_status()
+        self.status_loaded = False
+        self.is_new = uid is None
+        informer.start(self.namespace)
 
     def create(self):
+        self._load_status()
         if self.status == DeploymentStatus.NOT_EXIST:
-            self._create_deployment()
-
-            try:
-                self._create_service()
-            except Exception:
-                self._delete_deployment()
-                raise
-
-            self.status, self.host, self.port = self._get_status()
+            if not (self.is_new and self._acquire_warm_scanner()):
+                self._create()
 
         return {"status": self.status, "host": self.host, "port": self.port, "uid": self.uid}
 
     def delete(self):
+        self._load_status()
         if self.status != DeploymentStatus.NOT_EXIST:
             self._delete_deployment()
             self._delete_service()
+            informer.remove(self.uid)
 
     def is_ready(self):
+        self._load_status()
         return bool(self.host and self.port and self.status == DeploymentStatus.RUNNING)
 
+    @staticmethod
+    def refill_pool():
+        # Callers run this under a lock shared by all processes. The pool is counted from the API, as the
+        # informer may not have seen the scanners that another process has just created
+        deployer = KubernetesDeployer(None)
+        label_selector = "{}=warm".format(KubernetesDeployer.POOL_LABEL)
+        warm_deployments = (
+            deployer._apps_api()
+            .list_namespaced_deployment(deployer.namespace, label_selector=label_selector)
+            .items
+        )
+
+        for _ in range(KubernetesDeployer.WARM_POOL_SIZE - len(warm_deployments)):
+            KubernetesDeployer(None)._create(pool_state="warm")
+
+        # Drain surplus scanners, keeping ready ones in the pool
+        warm_deployments.sort(key=lambda deployment: not deployment.status.available_replicas)
+        for deployment in warm_deployments[KubernetesDeployer.WARM_POOL_SIZE :]:
+            deployer = KubernetesDeployer(deployment.metadata.name)
+            if deployer._set_pool_state(deployment, "draining"):
+                deployer.delete()
+
+    @staticmethod
+    def _get_pool_state(deployment):
+        return (deployment.metadata.labels or {}).get(KubernetesDeployer.POOL_LABEL)
+
+    def _create(self, pool_state=None):
+        deployment = self._create_deployment(pool_state)
+
+        try:
+            service = self._create_service()
+        except Exception:
+            self._delete_deployment()
+            raise
+
+        # Reflect the created objects before the watch delivers them
+        informer.update(deployment)
+        informer.update(service)
+        self.status, self.host, self.port = self._get_status()
+        self.status_loaded = True
+
+    def _acquire_warm_scanner(self):
+        if not informer.is_synced():
+            return False
+
+        for deployment in informer.list_deployments():
+            if KubernetesDeployer._get_pool_state(deployment) != "warm":
+                continue
+
+            uid = deployment.metadata.name
+            status, host, port = KubernetesDeployer._parse_status(*informer.get(uid))
+            if status != DeploymentStatus.RUNNING:
+                continue
+
+            if self._set_pool_state(deployment, "assigned"):
+                self.uid, self.status, self.host, self.port = uid, status, host, port
+                return True
+
+        return False
+
+    def _set_pool_state(self, deployment, pool_state):
+        # Including resourceVersion makes the patch fail if another process has changed the pool state
+        body = {
+            "metadata": {
+                "labels": {KubernetesDeployer.POOL_LABEL: pool_state},
+                "resourceVersion": deployment.metadata.resource_version,
+            }
+        }
+        try:
+            deployment = self._apps_api().patch_namespaced_deployment(
+                deployment.metadata.name, self.namespace, body
+            )
+        except ApiException as e:
+            if e.status in [404, 409]:
+                return False
+            raise
+
+        informer.update(deployment)
+        return True
+
+    def _load_status(self):
+        # Deployment status is read on first use, so that constructing a deployer costs no API call
+        if not self.status_loaded:
+            self.status, self.host, self.port = self._get_status()
+            self.status_loaded = True
+
     def _get_status(self):
+        if informer.is_synced():
+            return KubernetesDeployer._parse_status(*informer.get(self.uid))
+
+        try:
+            return KubernetesDeployer._parse_status(self._read_deployment(), self._read_service())
+        except ApiException as e:
+            if e.status == 404:
+                return DeploymentStatus.NOT_EXIST, None, None
+            raise
+
+    @staticmethod
+    def _parse_status(deployment, service):
         status = DeploymentStatus.NOT_READY
         host = None
         port = None
 
-        try:
-            deployment = self._read_deployment()
-            available_replicas = deployment.status.available_replicas
+        if deployment is None or service is None:
+            return DeploymentStatus.NOT_EXIST, host, port
 
-            service = self._read_service()
-            if service.status.load_balancer.ingress is not None:
-                host = service.status.load_balancer.ingress[0].ip
-                port = service.spec.ports[0].port
+        available_replicas = deployment.status.available_replicas
 
-            if available_replicas and host and port:
-                status = DeploymentStatus.RUNNING
+        if service.status.load_balancer.ingress is not None:
+            host = service.status.load_balancer.ingress[0].ip
+            port = service.spec.ports[0].port
 
-        except ApiException as e:
-            if e.status == 404:
-                status = DeploymentStatus.NOT_EXIST
-            else:
-                raise
+        if available_replicas and host and port:
+            status = DeploymentStatus.RUNNING
 
         return status, host, port
 
-    def _client(self):
-        config = k8s.Configuration()
-        config.api_key["authorization"] = "Bearer " + self._get_credential()
-        config.host = os.getenv("KUBERNETES_MASTER_SERVER", "localhost")
-        config.verify_ssl = False
-        return k8s.ApiClient(config)
+    def _apps_api(self):
+        return client_cache.get()[0]
 
-    def _get_credential(self):
-        headers = {"Metadata-Flavor": "Google"}
-        res = requests.get(KubernetesDeployer.GCP_METADATA_API_TOKEN_ENDPOINT, headers=headers)
-        return json.loads(res.text)["access_token"]
+    def _core_api(self):
+        return client_cache.get()[1]
 
     def _create_service(self):
         service_port = k8s.V1ServicePort(
@@ -137,9 +408,9 @@ class KubernetesDeployer(Deployer):
         )
         service_metadata = k8s.V1ObjectMeta(name=self.uid, labels={"app.kubernetes.io/name": self.uid})
         service = k8s.V1Service(spec=service_spec, metadata=service_metadata)
-        return k8s.CoreV1Api(self.client).create_namespaced_service(self.namespace, service)
+        return self._core_api().create_namespaced_service(self.namespace, service)
 
-    def _create_deployment(self):
+    def _create_deployment(self, pool_state=None):
         REPLICAS = 1
 
         container_port = k8s.V1ContainerPort(
@@ -164,18 +435,21 @@ class KubernetesDeployer(Deployer):
         pod_template = k8s.V1PodTemplateSpec(spec=pod_spec, metadata=pod_metadata)
         selector = k8s.V1LabelSelector(match_labels={"app.kubernetes.io/name": self.uid})
         deployment_spec = k8s.V1DeploymentSpec(replicas=REPLICAS, selector=selector, template=pod_template)
-        deployment_metadata = k8s.V1ObjectMeta(name=self.uid, labels={"app.kubernetes.io/name": self.uid})
+        deployment_labels = {"app.kubernetes.io/name": self.uid}
+        if pool_state:
+            deployment_labels[KubernetesDeployer.POOL_LABEL] = pool_state
+        deployment_metadata = k8s.V1ObjectMeta(name=self.uid, labels=deployment_labels)
         deployment = k8s.V1Deployment(spec=deployment_spec, metadata=deployment_metadata)
-        return k8s.AppsV1Api(self.client).create_namespaced_deployment(self.namespace, deployment)
+        return self._apps_api().create_namespaced_deployment(self.namespace, deployment)
 
     def _delete_service(self):
-        return k8s.CoreV1Api(self.client).delete_namespaced_service(self.uid, self.namespace)
+        return self._core_api().delete_namespaced_service(self.uid, self.namespace)
 
     def _delete_deployment(self):
-        return k8s.AppsV1Api(self.client).delete_namespaced_deployment(self.uid, self.namespace)
+        return self._apps_api().delete_namespaced_deployment(self.uid, self.namespace)
 
     def _read_service(self):
-        return k8s.CoreV1Api(self.client).read_namespaced_service(self.uid, self.namespace)
+        return self._core_api().read_namespaced_service(self.uid, self.namespace)
 
     def _read_deployment(self):
-        return k8s.AppsV1Api(self.client).read_namespaced_deployment(self.uid, self.namespace)
+        return self._apps_api().read_namespaced_deployment(self.uid, self.namespace)
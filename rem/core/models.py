@@ -1,10 +1,12 @@
 import uuid
+from datetime import datetime
 
 from peewee import SQL
 from peewee import BooleanField
 from peewee import CharField
 from peewee import DateTimeField
 from peewee import ForeignKeyField
+from peewee import IntegerField
 from peewee import TextField
 from peewee import UUIDField
 from playhouse.flask_utils import FlaskDB
@@ -29,7 +31,9 @@ class AuditTable(db.Model):
     rejected_reason = CharField(default="")
     slack_default_webhook_url = CharField(default="")
     created_at = DateTimeField(constraints=[SQL("DEFAULT CURRENT_TIMESTAMP")])
-    updated_at = DateTimeField(constraints=[SQL("DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP")])
+    updated_at = DateTimeField(
+        index=True, constraints=[SQL("DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP")]
+    )
 
 
 class ContactTable(db.Model):
@@ -44,6 +48,7 @@ class ContactTable(db.Model):
 class ScanTable(db.Model):
     class Meta:
         db_table = "scan"
+        indexes = ((("audit_id", "processed"), False),)
 
     uuid = UUIDField(unique=True)
     audit_id = ForeignKeyField(AuditTable, backref="scans", on_delete="CASCADE", on_update="CASCADE")
@@ -66,6 +71,7 @@ class ScanTable(db.Model):
 class TaskTable(db.Model):
     class Meta:
         db_table = "task"
+        indexes = ((("progress", "updated_at"), False), (("ov_host", "ov_port"), False))
 
     uuid = UUIDField(unique=True, default=uuid.uuid4)
     audit_id = ForeignKeyField(AuditTable, null=True, on_delete="SET NULL", on_update="CASCADE")
@@ -80,6 +86,9 @@ class TaskTable(db.Model):
     progress = CharField(default="")
     slack_webhook_url = CharField(default="")
     results = TextField(default="")
+    parse_lease_until = DateTimeField(default=Utils.get_default_datetime)
+    ov_host = CharField(default="")
+    ov_port = IntegerField(default=0)
     created_at = DateTimeField(constraints=[SQL("DEFAULT CURRENT_TIMESTAMP")])
     updated_at = DateTimeField(constraints=[SQL("DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP")])
 
@@ -87,10 +96,19 @@ class TaskTable(db.Model):
 class VulnTable(db.Model):
     class Meta:
         db_table = "vuln"
+        indexes = ((("fix_required", "oid"), False),)
 
     oid = CharField(unique=True, max_length=191, null=True, default=None)
     fix_required = CharField(default="UNDEFINED")
     advice = TextField(default="")
+    # Catalog of the vulnerability, maintained from the latest scan result on storing each report
+    name = CharField(null=True)
+    cvss_base = CharField(null=True)
+    cve = CharField(null=True)
+    description = TextField(null=True)
+    occurrences = IntegerField(default=0)
+    first_seen_at = DateTimeField(default=Utils.get_default_datetime)
+    last_seen_at = DateTimeField(default=Utils.get_default_datetime)
     created_at = DateTimeField(constraints=[SQL("DEFAULT CURRENT_TIMESTAMP")])
     updated_at = DateTimeField(constraints=[SQL("DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP")])
 
@@ -107,7 +125,7 @@ class ResultTable(db.Model):
     port = CharField(null=True)
     cvss_base = CharField(null=True)
     cve = CharField(null=True)
-    oid = CharField(null=True)
+    oid = CharField(null=True, index=True)
     description = TextField(null=True)
     qod = CharField(null=True)
     severity = CharField(null=True)
@@ -115,3 +133,15 @@ class ResultTable(db.Model):
     scanner = CharField(null=True)
     created_at = DateTimeField(constraints=[SQL("DEFAULT CURRENT_TIMESTAMP")])
     updated_at = DateTimeField(constraints=[SQL("DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP")])
+
+
+class SlackMessageTable(db.Model):
+    class Meta:
+        db_table = "slack_message"
+
+    webhook_url = CharField()
+    payload = TextField()
+    attempts = IntegerField(default=0)
+    claim_token = CharField(default="")
+    next_attempt_at = DateTimeField(default=datetime.utcnow, index=True)
+    created_at = DateTimeField(constraints=[SQL("DEFAULT CURRENT_TIMESTAMP")])
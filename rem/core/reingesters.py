@@ -0,0 +1,107 @@
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+
+from flask import current_app as app
+
+from .models import TaskTable
+from .tasks import SCAN_REPORT_KEY_NAME
+from .tasks import TaskProgress
+from .tasks import get_report_parser_initargs
+from .tasks import init_report_parser
+from .tasks import store_archived_report
+from .utils import Utils
+
+if Utils.is_gcp():
+    from .storages import CloudFileStorage as Storage
+else:
+    from .storages import LocalFileStorage as Storage
+
+REINGEST_MAX_WORKERS = int(os.getenv("REINGEST_MAX_WORKERS", str(os.cpu_count() or 1)))
+
+
+class ReportReingester:
+
+    IN_FLIGHT_JOBS_PER_WORKER = 2
+
+    def __init__(self, max_workers=REINGEST_MAX_WORKERS):
+        self.max_workers = max(max_workers, 1)
+
+    def run(self, scan_ids=None):
+        jobs = self._get_jobs(scan_ids)
+        app.logger.info("Reingesting {} archived report(s)...".format(len(jobs)))
+
+        succeeded = 0
+        for scan_id, key, is_stored in self._store(jobs):
+            if is_stored:
+                succeeded += 1
+
+        app.logger.info("Reingested {} of {} archived report(s)".format(succeeded, len(jobs)))
+        return succeeded
+
+    def _get_jobs(self, scan_ids):
+        # Results of a scan are loaded from the report of its latest successful task
+        task_query = (
+            TaskTable.select(TaskTable.uuid, TaskTable.audit_id, TaskTable.scan_id)
+            .where(TaskTable.progress == TaskProgress.DELETED.name)
+            .where(TaskTable.error_reason == "")
+            .where(TaskTable.audit_id.is_null(False) & TaskTable.scan_id.is_null(False))
+            .order_by(TaskTable.ended_at.asc())
+        )
+        if scan_ids:
+            task_query = task_query.where(TaskTable.scan_id.in_(scan_ids))
+
+        keys = {}
+        for task in task_query.dicts():
+            keys[task["scan_id"]] = SCAN_REPORT_KEY_NAME.format(
+                audit_id=task["audit_id"], scan_id=task["scan_id"], task_uuid=task["uuid"].hex
+            )
+
+        archived_keys = set(Storage().iter_keys())
+        return [(scan_id, key) for scan_id, key in keys.items() if key in archived_keys]
+
+    def _store(self, jobs):
+        if self.max_workers == 1 or len(jobs) <= 1:
+            for scan_id, key in jobs:
+                yield scan_id, key, self._store_one(scan_id, key)
+            return
+
+        # Parsing is CPU bound, so it fans out over processes, each storing results as it parses them
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("forkserver"),
+            initializer=init_report_parser,
+            initargs=get_report_parser_initargs(),
+        ) as executor:
+            jobs = iter(jobs)
+            futures = {}
+            while True:
+                # Submit only a few jobs per worker ahead, so that queued job arguments stay bounded
+                # however many reports are reingested
+                window = self.max_workers * ReportReingester.IN_FLIGHT_JOBS_PER_WORKER - len(futures)
+                for scan_id, key in itertools.islice(jobs, window):
+                    futures[executor.submit(store_archived_report, key, scan_id)] = (scan_id, key)
+                if not futures:
+                    break
+
+                done, _not_done = concurrent.futures.wait(
+                    futures, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    scan_id, key = futures.pop(future)
+                    try:
+                        is_stored = future.result()
+                    except Exception as error:
+                        app.logger.exception(
+                            "Failed to reingest archived report, key={}, error={}".format(key, error)
+                        )
+                        is_stored = False
+                    yield scan_id, key, is_stored
+
+    def _store_one(self, scan_id, key):
+        try:
+            return store_archived_report(key, scan_id)
+        except Exception as error:
+            app.logger.exception("Failed to reingest archived report, key={}, error={}".format(key, error))
+            return False
@@ -1,46 +1,220 @@
+import collections
+import os
+import threading
+import time
+import uuid
 from functools import wraps
 
 from flask import abort
+from flask import g
+from flask import has_request_context
 from flask_restplus import Resource
+from peewee import fn
 
 from core import AuditTable
+from core import ContactTable
 from core import ResultTable
 from core import ScanTable
 from core import VulnTable
 
 
+AUDIT_CACHE_SIZE = int(os.getenv("AUDIT_CACHE_SIZE", "1000"))
+AUDIT_CACHE_TTL = int(os.getenv("AUDIT_CACHE_TTL", "10"))
+
+
+class AuditCache:
+    """Read-through cache of audits with their contacts and scan UUIDs, keyed by both ID and UUID.
+
+    Entries live in `flask.g` for the current request, and in an in-process LRU across requests.
+    Other processes do not see invalidations made by this process, so the LRU keeps entries only
+    for `AUDIT_CACHE_TTL` seconds after they are read from the database.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.generation = 0
+
+    def get(self, audit_id=None, audit_uuid=None):
+        key = self._get_key(audit_id, audit_uuid)
+        if key is None:
+            return None
+
+        request_entries = self._get_request_entries()
+        if key in request_entries:
+            return request_entries[key]
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires_at"] < time.time():
+                self._remove(self.entries, entry)
+                return None
+            for entry_key in self._get_entry_keys(entry):
+                self.entries.move_to_end(entry_key)
+
+        for entry_key in self._get_entry_keys(entry):
+            request_entries[entry_key] = entry
+        return entry
+
+    def put(self, entry, generation):
+        request_entries = self._get_request_entries()
+        for entry_key in self._get_entry_keys(entry):
+            request_entries[entry_key] = entry
+
+        if self.size <= 0 or self.ttl <= 0:
+            return
+
+        with self.lock:
+            # Skip entries read before an invalidation, as they may be stale
+            if generation != self.generation:
+                return
+            for entry_key in self._get_entry_keys(entry):
+                self.entries[entry_key] = entry
+                self.entries.move_to_end(entry_key)
+            while len(self.entries) > self.size * 2:
+                _key, oldest = self.entries.popitem(last=False)
+                self._remove(self.entries, oldest)
+
+    def invalidate(self, audit_id=None, audit_uuid=None):
+        key = self._get_key(audit_id, audit_uuid)
+        request_entries = self._get_request_entries()
+
+        with self.lock:
+            self.generation += 1
+            if key is None:
+                request_entries.clear()
+                self.entries.clear()
+                return
+            for entries in [request_entries, self.entries]:
+                entry = entries.get(key)
+                if entry is not None:
+                    self._remove(entries, entry)
+
+    def new_entry(self, audit):
+        return {"audit": audit, "expires_at": time.time() + self.ttl}
+
+    def _get_key(self, audit_id, audit_uuid):
+        if audit_id is not None:
+            return ("id", int(audit_id))
+        try:
+            return ("uuid", uuid.UUID(str(audit_uuid)).hex)
+        except ValueError:
+            return None
+
+    def _get_entry_keys(self, entry):
+        return [("id", entry["audit"]["id"]), ("uuid", entry["audit"]["uuid"].hex)]
+
+    def _get_request_entries(self):
+        # Outside requests, e.g. in task handlers, the app context lives too long to cache in
+        if not has_request_context():
+            return {}
+        if "audit_cache" not in g:
+            g.audit_cache = {}
+        return g.audit_cache
+
+    def _remove(self, entries, entry):
+        for entry_key in self._get_entry_keys(entry):
+            entries.pop(entry_key, None)
+
+
+audit_cache = AuditCache(AUDIT_CACHE_SIZE, AUDIT_CACHE_TTL)
+
+
 class AuditResource(Resource):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
     @staticmethod
     def get_by_id(audit_id=None, audit_uuid=None, withContacts=False, withScans=False):
-        audit_query = AuditTable.select()
-
-        if audit_id is not None:
-            audit_query = audit_query.where(AuditTable.id == audit_id)
-        elif audit_uuid is not None:
-            audit_query = audit_query.where(AuditTable.uuid == audit_uuid)
-        else:
+        if audit_id is None and audit_uuid is None:
             abort(404, "Not Found")
 
-        try:
-            audit = audit_query.dicts()[0]
+        generation = audit_cache.generation
+        entry = audit_cache.get(audit_id=audit_id, audit_uuid=audit_uuid)
+        if entry is None:
+            audit_query = AuditTable.select()
+            if audit_id is not None:
+                audit_query = audit_query.where(AuditTable.id == audit_id)
+            else:
+                audit_query = audit_query.where(AuditTable.uuid == audit_uuid)
+
+            try:
+                audit = AuditResource.get_many(audit_query, withContacts=withContacts, withScans=withScans)[0]
+            except:
+                abort(404, "Not Found")
+            entry = audit_cache.new_entry(audit)
+            for relation in ["contacts", "scans"]:
+                if relation in audit:
+                    entry[relation] = audit.pop(relation)
+
+        if withContacts and "contacts" not in entry:
+            contact_query = ContactTable.select().where(ContactTable.audit_id == entry["audit"]["id"])
+            entry["contacts"] = list(contact_query.dicts())
+
+        if withScans and "scans" not in entry:
+            scan_query = ScanTable.select(ScanTable.uuid).where(ScanTable.audit_id == entry["audit"]["id"])
+            entry["scans"] = [scan["uuid"].hex for scan in scan_query.dicts()]
+
+        audit_cache.put(entry, generation)
+
+        # Return a copy, so that callers never modify cached entries
+        audit = dict(entry["audit"])
+        if withContacts:
+            audit["contacts"] = [dict(contact) for contact in entry["contacts"]]
+        if withScans:
+            audit["scans"] = list(entry["scans"])
+        return audit
+
+    @staticmethod
+    def get_many(audit_query, withContacts=False, withScans=False):
+        """Load audits of the query, prefetching contacts and scans by a single query for each"""
+        audits = list(audit_query.dicts())
+        audits_by_id = {}
+        for audit in audits:
             audit["slack_integration"] = bool(len(audit["slack_default_webhook_url"]) > 0)
-        except:
-            abort(404, "Not Found")
+            audits_by_id[audit["id"]] = audit
 
+        # Relations are selected by the IDs, as MySQL does not support LIMIT in the subquery of IN
         if withContacts:
-            audit["contacts"] = []
-            for contact in audit_query[0].contacts.dicts():
-                audit["contacts"].append(contact)
+            for audit in audits:
+                audit["contacts"] = []
+            if audits:
+                for contact in AuditResource.get_contact_query(list(audits_by_id)).dicts():
+                    audits_by_id[contact["audit_id"]]["contacts"].append(contact)
 
         if withScans:
-            audit["scans"] = []
-            for scan in audit_query[0].scans.dicts():
-                audit["scans"].append(scan["uuid"].hex)
+            for audit in audits:
+                audit["scans"] = []
+            if audits:
+                for scan in AuditResource.get_scan_query(list(audits_by_id)).dicts():
+                    audits_by_id[scan["audit_id"]]["scans"].append(scan["uuid"].hex)
 
-        return audit
+        return audits
+
+    @staticmethod
+    def get_contact_query(audit_ids):
+        return ContactTable.select().where(ContactTable.audit_id.in_(audit_ids)).order_by(ContactTable.id)
+
+    @staticmethod
+    def get_scan_query(audit_ids):
+        return (
+            ScanTable.select(ScanTable.uuid, ScanTable.audit_id)
+            .where(ScanTable.audit_id.in_(audit_ids))
+            .order_by(ScanTable.id)
+        )
+
+    @staticmethod
+    def update(audit_id, params):
+        AuditTable.update(params).where(AuditTable.id == audit_id).execute()
+        audit_cache.invalidate(audit_id=audit_id)
+
+    @staticmethod
+    def invalidate(audit_id=None, audit_uuid=None):
+        audit_cache.invalidate(audit_id=audit_id, audit_uuid=audit_uuid)
 
     @staticmethod
     def get_audit_id_by_uuid(audit_uuid):
@@ -82,13 +256,34 @@ class ScanResource(Resource):
 
         if withResults:
             scan["results"] = []
-
-            results = (
-                ResultTable.select(ResultTable, VulnTable.fix_required, VulnTable.advice)
-                .join(VulnTable, on=(ResultTable.oid == VulnTable.oid))
-                .where(ResultTable.scan_id == scan["id"])
-            )
-            for result in results.dicts():
+            for result in ScanResource.get_result_query(scan["id"]).dicts():
                 scan["results"].append(result)
 
         return scan
+
+    @staticmethod
+    def get_result_query(scan_id):
+        return (
+            ResultTable.select(ResultTable, VulnTable.fix_required, VulnTable.advice)
+            .join(VulnTable, on=(ResultTable.oid == VulnTable.oid))
+            .where(ResultTable.scan_id == scan_id)
+        )
+
+    @staticmethod
+    def detach_results(scan_ids):
+        """Detach results from the scans, taking them out of the occurrences of the vulnerability catalog
+
+        Occurrences of a vulnerability count its results attached to a live scan, so results must be
+        detached by this method rather than by SET NULL of the foreign key when their scan is deleted.
+        """
+        result_query = (
+            ResultTable.select(ResultTable.oid, fn.COUNT(ResultTable.id).alias("occurrences"))
+            .where(ResultTable.scan_id.in_(scan_ids))
+            .group_by(ResultTable.oid)
+        )
+        for result in result_query.dicts():
+            VulnTable.update(occurrences=VulnTable.occurrences - result["occurrences"]).where(
+                VulnTable.oid == result["oid"]
+            ).execute()
+
+        ResultTable.update(scan_id=None).where(ResultTable.scan_id.in_(scan_ids)).execute()
@@ -1,13 +1,15 @@
 import os
+import threading
+import time
 from enum import Enum
 from enum import auto
-from xml.etree import ElementTree
 
 from flask import current_app as app
 
 from openvas_lib import VulnscanManager
 from openvas_lib import VulnscanServerError
-from openvas_lib import report_parser_from_text
+from openvas_lib import report_parser_iter
+from openvas_lib.common import ConnectionLostError
 
 from .utils import Utils
 
@@ -23,6 +25,64 @@ class ScanStatus(Enum):
     FAILED = auto()
 
 
+class OpenVASConnectionPool:
+
+    MAX_IDLE_SECONDS = 10 * 60
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.idle_connections = {}
+
+    def acquire(self, host, port, user, password, timeout, reuse=True):
+        """Check out a connection exclusively, returning it with whether it has been reused from the pool"""
+        key = (host, port, user)
+
+        while reuse:
+            with self.lock:
+                self._evict_idle()
+                idle_connections = self.idle_connections.get(key)
+                if not idle_connections:
+                    break
+                conn, _released_at = idle_connections.pop()
+
+            if conn.is_alive():
+                return conn, True
+            app.logger.info("Pooled connection to {}:{} was closed, reconnecting...".format(host, port))
+            self.close(conn)
+
+        app.logger.info("Trying to connect to scanner {}:{} ...".format(host, port))
+        return VulnscanManager(host, user, password, port, timeout), False
+
+    def release(self, host, port, user, conn):
+        with self.lock:
+            self.idle_connections.setdefault((host, port, user), []).append((conn, time.time()))
+
+    def discard(self, host, port, user):
+        with self.lock:
+            idle_connections = self.idle_connections.pop((host, port, user), [])
+        for conn, _released_at in idle_connections:
+            self.close(conn)
+
+    def close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _evict_idle(self):
+        now = time.time()
+        for key, idle_connections in list(self.idle_connections.items()):
+            for conn, released_at in list(idle_connections):
+                if now - released_at > OpenVASConnectionPool.MAX_IDLE_SECONDS:
+                    idle_connections.remove((conn, released_at))
+                    self.close(conn)
+            if not idle_connections:
+                del self.idle_connections[key]
+
+
+connection_pool = OpenVASConnectionPool()
+
+
 class OpenVASScanner:
 
     SCANNER_NAME = "OpenVAS Default"
@@ -43,8 +103,6 @@ class OpenVASScanner:
             self.ov_deployment_id = session.get("ov_deployment_id")
             self.ov_host = session.get("ov_host")
             self.ov_port = session.get("ov_port")
-            if self.ov_host and self.ov_port and Deployer(session["ov_deployment_id"]).is_ready():
-                self.conn = self._connect()
 
     def create(self):
         ov_server = Deployer(self.ov_deployment_id).create()
@@ -58,15 +116,25 @@ class OpenVASScanner:
         }
         return self.session
 
-    def delete(self):
+    def delete(self, keep_scanner=False):
+        if keep_scanner:
+            # Other scans are running on the same scanner, so remove only the scan/target of this session
+            app.logger.info("Trying to delete scan from shared scanner...")
+            if self.session["ov_scan_id"] and self.session["ov_target_id"]:
+                self._request(lambda conn: conn.delete_scan(self.session["ov_scan_id"]))
+                self._request(lambda conn: conn.delete_target(self.session["ov_target_id"]))
+            app.logger.info("Completed to delete scan.")
+            return
+
         app.logger.info("Trying to delete scanner...")
         Deployer(self.ov_deployment_id).delete()
 
         if self.session["ov_scan_id"] and self.session["ov_target_id"] and not Utils.is_gcp():
             # Cleanup OpenVAS scan/target manually if local environment
-            self.conn.delete_scan(self.session["ov_scan_id"])
-            self.conn.delete_target(self.session["ov_target_id"])
+            self._request(lambda conn: conn.delete_scan(self.session["ov_scan_id"]))
+            self._request(lambda conn: conn.delete_target(self.session["ov_target_id"]))
 
+        connection_pool.discard(self.ov_host, self.ov_port, self.user)
         app.logger.info("Completed to delete scanner.")
 
     def is_ready(self):
@@ -74,8 +142,11 @@ class OpenVASScanner:
 
     def launch_scan(self, target):
         app.logger.info("Trying to launch new scan...")
-        ov_scan_id, ov_target_id = self.conn.launch_scan(
-            target=target, profile=self.profile, alive_test=self.alive_test, max_hosts=1, max_checks=3
+        ov_scan_id, ov_target_id = self._request(
+            lambda conn: conn.launch_scan(
+                target=target, profile=self.profile, alive_test=self.alive_test, max_hosts=1, max_checks=3
+            ),
+            retry=False,
         )
         self.session["target"] = target
         self.session["ov_scan_id"] = ov_scan_id
@@ -83,9 +154,11 @@ class OpenVASScanner:
         app.logger.info("Completed to launch scan, session={}".format(self.session))
         return self.session
 
-    def check_status(self):
+    def check_status(self, timeout=DEFAULT_TIMEOUT):
         try:
-            status = self.conn.get_scan_status(self.session["ov_scan_id"])
+            status = self._request(
+                lambda conn: conn.get_scan_status(self.session["ov_scan_id"]), timeout=timeout
+            )
             app.logger.info("Current scan progress={}, session={}".format(status, self.session))
             # See https://github.com/greenbone/gvmd/blob/577f1b463f5861794bb97066dd0c9c4ab6c223df/src/manage.c#L1482
             if status in ["New", "Running", "Requested"]:
@@ -98,42 +171,77 @@ class OpenVASScanner:
             app.logger.exception("Scan status check error, reason={}".format(error))
             return ScanStatus.RUNNING
 
-    def get_report(self):
+    def get_report(self, output):
         app.logger.info("Trying to get scan report...")
-        ov_report_id = self.conn.get_report_id(self.session["ov_scan_id"])
+        ov_report_id = self._request(lambda conn: conn.get_report_id(self.session["ov_scan_id"]))
+
+        def download_report(conn):
+            output.seek(0)
+            output.truncate()
+            conn.get_report_xml(ov_report_id, output)
+            return conn.last_response_stats
 
         app.logger.info("Found report_id={}".format(ov_report_id))
-        report_xml = self.conn.get_report_xml(ov_report_id)
-        report_txt = ElementTree.tostring(report_xml, encoding="unicode", method="xml")
+        stats = self._request(download_report)
+        app.logger.info(
+            "Received report, {} bytes in {:.3f} sec (parse {:.3f} sec).".format(
+                stats["bytes"], stats["elapsed"], stats["parse_time"]
+            )
+        )
+        app.logger.info("Completed to downloaded report, {} bytes.".format(output.tell()))
+        return output
 
-        app.logger.info("Completed to downloaded report, {} characters.".format(len(report_txt)))
-        self.conn.delete_report(ov_report_id)
-        return report_txt
+    def delete_report(self):
+        ov_report_id = self._request(lambda conn: conn.get_report_id(self.session["ov_scan_id"]))
+        if ov_report_id:
+            self._request(lambda conn: conn.delete_report(ov_report_id))
 
-    def _connect(self):
+    def _connect(self, timeout, reuse=True):
         try:
-            app.logger.info("Trying to connect to scanner {}:{} ...".format(self.ov_host, self.ov_port))
-            return VulnscanManager(self.ov_host, self.user, self.password, self.ov_port, self.DEFAULT_TIMEOUT)
+            return connection_pool.acquire(
+                self.ov_host, self.ov_port, self.user, self.password, timeout, reuse
+            )
         except VulnscanServerError:
             raise ScanServerException("Scan server connection error.")
 
+    def _request(self, func, retry=True, timeout=DEFAULT_TIMEOUT):
+        conn, is_reused = self._connect(timeout)
+        try:
+            return self._call(func, conn, timeout)
+        except ConnectionLostError as error:
+            if not (retry and is_reused):
+                raise
+            # Pooled connection may have been dropped by the server while idle, so retry once with a new one
+            app.logger.info("Retrying request with a new connection, reason={}".format(error))
+            conn, _is_reused = self._connect(timeout, reuse=False)
+            return self._call(func, conn, timeout)
+
+    def _call(self, func, conn, timeout):
+        try:
+            # Pooled connections are shared by requests with different timeouts, so set it on every call
+            conn.set_timeout(timeout)
+            result = func(conn)
+        except Exception:
+            # The response may have been left half read, so the connection is never reused after an error
+            connection_pool.close(conn)
+            raise
+        connection_pool.release(self.ov_host, self.ov_port, self.user, conn)
+        return result
+
+    @classmethod
+    def refill_pool(cls):
+        Deployer.refill_pool()
+
     @classmethod
     def get_info(cls):
         return {"source_ip": os.getenv("OPENVAS_SCAN_ENDPOINT", "127.0.0.1")}
 
     @classmethod
-    def parse_report(cls, report_txt):
+    def parse_report(cls, report_file):
+        """Yield results of the report one by one, as it is parsed"""
         app.logger.info("Trying to parse report...")
-        parse_records = report_parser_from_text(report_txt, ignore_log_info=False)
-
-        vulns = []
-        results = []
-
-        for record in parse_records:
-            vuln = {"oid": record.nvt.oid}
-            vulns.append(vuln)
-
-            result = {
+        for record in report_parser_iter(report_file, ignore_log_info=False):
+            yield {
                 "name": record.nvt.name,
                 "host": record.host,
                 "port": record.port.port_name,
@@ -146,9 +254,6 @@ class OpenVASScanner:
                 "severity_rank": record.threat,
                 "scanner": OpenVASScanner.SCANNER_NAME,
             }
-            results.append(result)
-
-        return {"results": results, "vulns": vulns}
 
 
 class ScanServerException(Exception):
@@ -0,0 +1,116 @@
+import time
+
+import pytz
+from flask import current_app as app
+
+from .models import TaskTable
+from .models import db
+from .tasks import DeletedTask
+from .tasks import FailedTask
+from .tasks import PendingTask
+from .tasks import RunningTask
+from .tasks import StoppedTask
+from .tasks import TaskProgress
+
+
+class TaskScheduler:
+
+    IDLE_INTERVAL = 30  # Interval to look for tasks registered through API
+
+    HANDLERS = {
+        TaskProgress.PENDING.name: (PendingTask, 1 * 60),  # Retry interval while waiting for scanner
+        TaskProgress.RUNNING.name: (RunningTask, 1 * 60),  # Status poll interval of running scans
+        TaskProgress.STOPPED.name: (StoppedTask, 1 * 60),  # Retry interval of report ingestion
+        TaskProgress.FAILED.name: (FailedTask, 1 * 60),
+        TaskProgress.DELETED.name: (DeletedTask, 3 * 60),
+    }
+
+    def __init__(self):
+        self.handled_at = {progress: 0 for progress in TaskScheduler.HANDLERS}
+        self.snapshots = {progress: None for progress in TaskScheduler.HANDLERS}
+
+    def run(self):
+        app.logger.info("Task scheduler started.")
+        while True:
+            try:
+                db.database.connect(reuse_if_open=True)
+                wait = self.run_once()
+            except Exception as error:
+                app.logger.exception("Scheduler error, error={}".format(error))
+                wait = TaskScheduler.IDLE_INTERVAL
+            finally:
+                # Connect on every tick rather than holding a connection idle while sleeping
+                db.close_db(None)
+
+            if wait > 0:
+                time.sleep(wait)
+
+    def run_once(self):
+        """Run due task handlers, and return seconds to wait until the next deadline"""
+        tasks = self._get_tasks()
+        deadlines = self._get_deadlines(tasks, time.time())
+
+        now = time.time()
+        due_progresses = [progress for progress, deadline in deadlines.items() if deadline <= now]
+        if not due_progresses:
+            return min([TaskScheduler.IDLE_INTERVAL] + [deadline - now for deadline in deadlines.values()])
+
+        snapshot = self._get_snapshot(tasks)
+        for progress in due_progresses:
+            handler, _interval = TaskScheduler.HANDLERS[progress]
+            self.handled_at[progress] = time.time()
+            self.snapshots[progress] = snapshot
+            handler().handle()
+
+        return 0
+
+    def _get_tasks(self):
+        task_query = TaskTable.select(
+            TaskTable.id, TaskTable.progress, TaskTable.start_at, TaskTable.end_at
+        ).where(TaskTable.progress != TaskProgress.DELETED.name)
+        return list(task_query.dicts())
+
+    def _get_snapshot(self, tasks):
+        return frozenset((task["id"], task["progress"]) for task in tasks)
+
+    def _get_deadlines(self, tasks, now):
+        snapshot = self._get_snapshot(tasks)
+        deadlines = {}
+
+        for progress, (_handler, interval) in TaskScheduler.HANDLERS.items():
+            # Handle immediately if tasks have changed since the last run, otherwise retry by the interval
+            if self.snapshots[progress] != snapshot:
+                deadline = now
+            else:
+                deadline = self.handled_at[progress] + interval
+
+            if progress == TaskProgress.DELETED.name:
+                deadlines[progress] = self.handled_at[progress] + interval
+                continue
+
+            progress_tasks = [task for task in tasks if task["progress"] == progress]
+            if not progress_tasks:
+                if progress == TaskProgress.PENDING.name:
+                    # Keep running periodically so that the scanner warm pool is refilled
+                    deadlines[progress] = self.handled_at[progress] + interval
+                continue
+
+            if progress == TaskProgress.PENDING.name:
+                start_ats = [self._get_timestamp(task["start_at"]) for task in progress_tasks]
+                if min(start_ats) > now:
+                    # No scheduled time has come yet
+                    deadline = min(start_ats)
+                else:
+                    deadline = min([deadline] + [start_at for start_at in start_ats if start_at > now])
+
+            elif progress == TaskProgress.RUNNING.name:
+                end_ats = [self._get_timestamp(task["end_at"]) for task in progress_tasks]
+                end_ats = [end_at for end_at in end_ats if end_at > self.handled_at[progress]]
+                deadline = min([deadline] + end_ats)
+
+            deadlines[progress] = deadline
+
+        return deadlines
+
+    def _get_timestamp(self, value):
+        return value.replace(tzinfo=pytz.utc).timestamp()
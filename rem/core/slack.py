@@ -1,9 +1,18 @@
 import json
+import threading
+import uuid
+from datetime import datetime
+from datetime import timedelta
 
 import requests
+from flask import current_app as app
+
+from .models import SlackMessageTable
+from .models import db
 
 USERNAME = "CASVAL"
 ICON_EMOJI = ":robot_face:"
+REQUEST_TIMEOUT = (3.05, 10)  # Connect and read timeout in seconds
 
 
 class SlackIntegrator:
@@ -13,6 +22,8 @@ class SlackIntegrator:
     COLOR_UNRATED = "#000000"
     COLOR_GOOD = "good"
 
+    session = requests.Session()
+
     def __init__(self, webhook_url):
         self.webhook_url = webhook_url
 
@@ -21,4 +32,143 @@ class SlackIntegrator:
         if attachments:
             payload["attachments"] = attachments
 
-        requests.post(self.webhook_url, data=json.dumps(payload))
+        res = SlackIntegrator.session.post(
+            self.webhook_url, data=json.dumps(payload), timeout=REQUEST_TIMEOUT
+        )
+        res.raise_for_status()
+
+    def enqueue(self, title, attachments):
+        payload = {"title": title, "attachments": attachments}
+        SlackMessageTable.create(webhook_url=self.webhook_url, payload=json.dumps(payload))
+        outbox.start(app._get_current_object())
+        outbox.wake()
+
+
+class SlackOutbox:
+
+    POLL_INTERVAL = 10
+    LEASE_SECONDS = 60
+    MAX_ATTEMPTS = 8
+    BACKOFF_BASE_SECONDS = 5
+    BACKOFF_MAX_SECONDS = 15 * 60
+    MAX_COALESCED_MESSAGES = 10
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.event = threading.Event()
+        self.thread = None
+
+    def start(self, flask_app):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._run, args=(flask_app,), daemon=True)
+            self.thread.start()
+
+    def wake(self):
+        self.event.set()
+
+    def drain(self):
+        messages = self._claim()
+
+        # Coalesce messages by webhook, keeping the order they were queued
+        webhooks = {}
+        for message in messages:
+            webhooks.setdefault(message["webhook_url"], []).append(message)
+
+        for webhook_url, webhook_messages in webhooks.items():
+            for batch in SlackOutbox._coalesce(webhook_messages):
+                self._send(webhook_url, batch)
+
+        return len(messages)
+
+    @staticmethod
+    def _coalesce(messages):
+        # Only messages without attachments are joined, as Slack shows all attachments below the joined titles
+        # and the results of different scans would be mixed up
+        batch = []
+        for message in messages:
+            if json.loads(message["payload"])["attachments"]:
+                if batch:
+                    yield batch
+                    batch = []
+                yield [message]
+                continue
+            batch.append(message)
+            if len(batch) >= SlackOutbox.MAX_COALESCED_MESSAGES:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _run(self, flask_app):
+        with flask_app.app_context():
+            while True:
+                try:
+                    self.drain()
+                except Exception as error:
+                    app.logger.exception("Failed to drain Slack outbox, error={}".format(error))
+                finally:
+                    db.close_db(None)
+
+                self.event.wait(SlackOutbox.POLL_INTERVAL)
+                self.event.clear()
+
+    def _claim(self):
+        now = datetime.utcnow()
+        claim_token = uuid.uuid4().hex
+
+        message_query = (
+            SlackMessageTable.select(SlackMessageTable.id)
+            .where(SlackMessageTable.next_attempt_at <= now)
+            .order_by(SlackMessageTable.id)
+            .limit(100)
+        )
+        message_ids = [message["id"] for message in message_query.dicts()]
+        if not message_ids:
+            return []
+
+        # Lease the messages, so that workers in other processes skip them while being sent
+        SlackMessageTable.update(
+            claim_token=claim_token, next_attempt_at=now + timedelta(seconds=SlackOutbox.LEASE_SECONDS)
+        ).where(
+            (SlackMessageTable.id.in_(message_ids)) & (SlackMessageTable.next_attempt_at <= now)
+        ).execute()
+
+        message_query = (
+            SlackMessageTable.select()
+            .where(SlackMessageTable.claim_token == claim_token)
+            .order_by(SlackMessageTable.id)
+        )
+        return list(message_query.dicts())
+
+    def _send(self, webhook_url, messages):
+        payloads = [json.loads(message["payload"]) for message in messages]
+        title = "\n".join([payload["title"] for payload in payloads])
+        attachments = [attachment for payload in payloads for attachment in payload["attachments"]]
+        message_ids = [message["id"] for message in messages]
+
+        try:
+            SlackIntegrator(webhook_url).send(title, attachments)
+        except Exception as error:
+            app.logger.warn("Failed to send a message to Slack, error={}".format(error))
+            for message in messages:
+                self._retry_later(message)
+            return
+
+        SlackMessageTable.delete().where(SlackMessageTable.id.in_(message_ids)).execute()
+
+    def _retry_later(self, message):
+        attempts = message["attempts"] + 1
+        if attempts >= SlackOutbox.MAX_ATTEMPTS:
+            app.logger.warn("Gave up sending a message to Slack, message={}".format(message))
+            SlackMessageTable.delete().where(SlackMessageTable.id == message["id"]).execute()
+            return
+
+        delay = min(SlackOutbox.BACKOFF_BASE_SECONDS * (2 ** attempts), SlackOutbox.BACKOFF_MAX_SECONDS)
+        SlackMessageTable.update(
+            attempts=attempts, claim_token="", next_attempt_at=datetime.utcnow() + timedelta(seconds=delay)
+        ).where(SlackMessageTable.id == message["id"]).execute()
+
+
+outbox = SlackOutbox()
@@ -1,45 +1,140 @@
+import contextlib
+import gzip
+import io
 import os
+import tempfile
 
 from flask import current_app as app
 from google.cloud import storage
 
+STORAGE_CHUNK_SIZE = 1024 * 1024
+STORAGE_GZIP_LEVEL = 6
 
-class LocalFileStorage:
 
-    RESULT_DIR_NAME = "/results"
+class BaseStorage:
 
-    def __init__(self):
-        self.results_dir = os.path.realpath(
-            os.path.dirname(os.path.abspath(__file__)) + "/.." + self.RESULT_DIR_NAME
-        )
-        os.makedirs(self.results_dir, exist_ok=True)
+    COMPRESSED_SUFFIX = ".gz"
 
     def store(self, key, body):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        if isinstance(body, bytes):
+            body = io.BytesIO(body)
+
         try:
-            filepath = self.results_dir + "/" + key
-            with open(filepath, "w", encoding="utf8") as file:
-                file.write(body)
+            with tempfile.TemporaryFile() as compressed:
+                size = self._compress(body, compressed)
+                compressed_size = compressed.tell()
+                compressed.seek(0)
+                self._write(key + BaseStorage.COMPRESSED_SUFFIX, compressed)
+
+            app.logger.info("Stored {}, {} bytes compressed to {} bytes".format(key, size, compressed_size))
         except Exception as e:
             app.logger.warn(e)
             return False
 
         return True
 
+    def exists(self, key):
+        # Reports stored uncompressed by earlier versions have no suffix
+        return self._exists(key + BaseStorage.COMPRESSED_SUFFIX) or self._exists(key)
+
+    @contextlib.contextmanager
+    def open(self, key):
+        """Open the stored report as a binary file object, decompressing it on the fly"""
+        if self._exists(key + BaseStorage.COMPRESSED_SUFFIX):
+            with self._read(key + BaseStorage.COMPRESSED_SUFFIX) as raw, gzip.GzipFile(
+                fileobj=raw, mode="rb"
+            ) as file:
+                yield file
+        else:
+            # Stored uncompressed by earlier versions
+            with self._read(key) as file:
+                yield file
+
+    def iter_keys(self):
+        keys = set()
+        for name in self._list():
+            if name.endswith(BaseStorage.COMPRESSED_SUFFIX):
+                name = name[: -len(BaseStorage.COMPRESSED_SUFFIX)]
+            if name not in keys:
+                keys.add(name)
+                yield name
+
+    def _compress(self, src, dst):
+        size = 0
+        with gzip.GzipFile(fileobj=dst, mode="wb", compresslevel=STORAGE_GZIP_LEVEL, mtime=0) as gz:
+            for chunk in iter(lambda: src.read(STORAGE_CHUNK_SIZE), b""):
+                size += len(chunk)
+                gz.write(chunk)
+        return size
+
+    def _exists(self, key):
+        raise NotImplementedError()
+
+    def _write(self, key, file):
+        raise NotImplementedError()
+
+    def _read(self, key):
+        raise NotImplementedError()
+
+    def _list(self):
+        raise NotImplementedError()
+
+
+class LocalFileStorage(BaseStorage):
+
+    RESULT_DIR_NAME = "/results"
+
+    def __init__(self):
+        self.results_dir = os.path.realpath(
+            os.path.dirname(os.path.abspath(__file__)) + "/.." + self.RESULT_DIR_NAME
+        )
+        os.makedirs(self.results_dir, exist_ok=True)
+
+    def _exists(self, key):
+        return os.path.exists(self.results_dir + "/" + key)
+
+    def _write(self, key, file):
+        filepath = self.results_dir + "/" + key
+        # Write to a temporary file first, so that readers never see a partially written file
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(filepath), prefix=".", delete=False) as tmp:
+            for chunk in iter(lambda: file.read(STORAGE_CHUNK_SIZE), b""):
+                tmp.write(chunk)
+        os.replace(tmp.name, filepath)
+
+    def _read(self, key):
+        return open(self.results_dir + "/" + key, "rb")
+
+    def _list(self):
+        for name in sorted(os.listdir(self.results_dir)):
+            if os.path.isfile(self.results_dir + "/" + name) and not name.startswith("."):
+                yield name
 
-class CloudFileStorage:
+
+class CloudFileStorage(BaseStorage):
 
     RESULT_DIR_NAME = "results/"
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # Must be a multiple of 256 KiB
 
     def __init__(self):
         self.client = storage.Client(project=os.environ["GCP_PROJECT_NAME"])
         self.bucket = self.client.get_bucket(os.environ["GCP_REPORT_STORAGE_NAME"])
 
-    def store(self, key, body):
-        try:
-            blob = self.bucket.blob(self.RESULT_DIR_NAME + key)
-            blob.upload_from_string(body)
-        except Exception as e:
-            app.logger.warn(e)
-            return False
+    def _exists(self, key):
+        return self.bucket.blob(self.RESULT_DIR_NAME + key).exists()
 
-        return True
+    def _write(self, key, file):
+        # Setting chunk size makes the upload resumable, sent in chunks
+        blob = self.bucket.blob(self.RESULT_DIR_NAME + key, chunk_size=CloudFileStorage.UPLOAD_CHUNK_SIZE)
+        blob.upload_from_file(file, content_type="application/gzip")
+
+    def _read(self, key):
+        file = tempfile.TemporaryFile()
+        self.bucket.blob(self.RESULT_DIR_NAME + key).download_to_file(file)
+        file.seek(0)
+        return file
+
+    def _list(self):
+        for blob in self.bucket.list_blobs(prefix=self.RESULT_DIR_NAME):
+            yield blob.name[len(self.RESULT_DIR_NAME) :]
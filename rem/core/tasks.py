@@ -1,12 +1,20 @@
+import concurrent.futures
+import functools
 import json
+import multiprocessing
 import os
+import tempfile
+import time
 from datetime import datetime
 from datetime import timedelta
 from enum import Enum
 from enum import auto
 
 import pytz
+from flask import Flask
 from flask import current_app as app
+from peewee import chunked
+from peewee import PeeweeException
 from peewee import fn
 
 from .models import ResultTable
@@ -15,10 +23,12 @@ from .models import TaskTable
 from .models import VulnTable
 from .models import db
 from .resources import AuditResource
+from .resources import ScanResource
 from .scanners import OpenVASScanner as Scanner
 from .scanners import ScanServerException
 from .scanners import ScanStatus
 from .slack import SlackIntegrator
+from .slack import outbox as slack_outbox
 from .utils import Utils
 
 if Utils.is_gcp():
@@ -28,6 +38,63 @@ else:
 
 SCAN_REPORT_KEY_NAME = "{audit_id:08}-{scan_id:08}-{task_uuid:.8}.xml"
 SCAN_MAX_DURATION_IN_HOUR = 24
+VULN_INSERT_BATCH_SIZE = int(os.getenv("VULN_INSERT_BATCH_SIZE", "1000"))
+RESULT_INSERT_BATCH_SIZE = int(os.getenv("RESULT_INSERT_BATCH_SIZE", "200"))
+SCANNER_MAX_SCANS_PER_INSTANCE = int(os.getenv("SCANNER_MAX_SCANS_PER_INSTANCE", "1"))
+STATUS_CHECK_MAX_WORKERS = int(os.getenv("STATUS_CHECK_MAX_WORKERS", "10"))
+STATUS_CHECK_TIMEOUT = int(os.getenv("STATUS_CHECK_TIMEOUT", "60"))
+REPORT_PARSE_MAX_WORKERS = int(os.getenv("REPORT_PARSE_MAX_WORKERS", "2"))
+REPORT_PARSE_TIMEOUT = int(os.getenv("REPORT_PARSE_TIMEOUT", "30")) * 60
+REPORT_PASS_TIME_BUDGET = int(os.getenv("REPORT_PASS_TIME_BUDGET", "60"))  # Within gunicorn's 90 sec timeout
+SCANNER_POOL_LOCK_NAME = "casval_scanner_pool"
+
+status_check_executor = concurrent.futures.ThreadPoolExecutor(max_workers=STATUS_CHECK_MAX_WORKERS)
+report_commit_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+
+def init_report_parser(database_class, database_name, connect_params):
+    # Parser processes start from the fork server rather than the threaded web worker, whose locks may be
+    # held by other threads at fork. The app cannot be pickled, so an app of their own is set up to connect
+    # to the same database, where parsed results are stored
+    flask_app = Flask(__name__)
+    flask_app.config["DATABASE"] = database_class(database_name, **connect_params)
+    db.init_app(flask_app)
+    flask_app.app_context().push()
+
+
+def get_report_parser_initargs():
+    database = app.config["DATABASE"]
+    return (type(database), database.database, database.connect_params)
+
+
+def store_report_file(path, scan_id, task=None):
+    try:
+        with open(path, "rb") as report_file:
+            return store_parsed_report(report_file, scan_id, task)
+    finally:
+        os.remove(path)
+
+
+def store_archived_report(key, scan_id, task=None):
+    with Storage().open(key) as report_file:
+        return store_parsed_report(report_file, scan_id, task)
+
+
+def store_parsed_report(report_file, scan_id, task=None):
+    """Store results of the report while parsing it, and return False if the task is no longer stopped"""
+    try:
+        with db.database.atomic():
+            if task is not None:
+                task_query = TaskTable.select(TaskTable.id).where(
+                    (TaskTable.id == task["id"]) & (TaskTable.progress == TaskProgress.STOPPED.name)
+                )
+                if not task_query.exists():
+                    return False
+                StoppedTask()._reset_scan_schedule(task)
+            StoppedTask.store_report(scan_id, Scanner.parse_report(report_file))
+        return True
+    finally:
+        db.close_db(None)
 
 
 class TaskProgress(Enum):
@@ -43,9 +110,13 @@ class BaseTask:
         self.progress = progress
 
     def handle(self):
+        # Drain messages left in the outbox by previous processes
+        slack_outbox.start(app._get_current_object())
+
         for task in self._get_tasks():
             try:
-                if self._is_task_expired(task) and self.progress != TaskProgress.DELETED.name:
+                is_expired = not task.pop("has_scan")
+                if is_expired and self.progress != TaskProgress.DELETED.name:
                     task["error_reason"] = "Scan was cancelled by user."
                     app.logger.info("Delete task due to cancellation, task={task}".format(task=task))
                     self._update(task, next_progress=TaskProgress.DELETED.name)
@@ -59,18 +130,16 @@ class BaseTask:
         return True
 
     def _get_tasks(self):
-        task_query = (
-            TaskTable.select().where(TaskTable.progress == self.progress).order_by(TaskTable.updated_at.asc())
+        return list(self.get_task_query().dicts())
+
+    def get_task_query(self):
+        # Task is expired if its scan has been cancelled, i.e. no scan refers to the task any more
+        scan_query = ScanTable.select(ScanTable.id).where(ScanTable.task_uuid == TaskTable.uuid)
+        return (
+            TaskTable.select(TaskTable, fn.EXISTS(scan_query).alias("has_scan"))
+            .where(TaskTable.progress == self.progress)
+            .order_by(TaskTable.updated_at.asc())
         )
-        return list(task_query.dicts())
-
-    def _is_task_expired(self, task):
-        scan_query = (
-            ScanTable()
-            .select(fn.Count(ScanTable.id).alias("count"))
-            .where((ScanTable.task_uuid == task["uuid"]))
-        )
-        return scan_query.dicts().get()["count"] == 0
 
     def _get_slack_message(self, task, next_progress):
         title = ""
@@ -130,10 +199,8 @@ class BaseTask:
                 audit = AuditResource.get_by_id(task["audit_id"])
                 webhook_url = audit["slack_default_webhook_url"]
             if webhook_url:
-                try:
-                    SlackIntegrator(webhook_url).send(title, attachments)
-                except Exception as error:
-                    app.logger.warn("Failed to send a message to Slack, error={}".format(error))
+                # Sent by the outbox worker, so that a slow webhook does not block task processing
+                SlackIntegrator(webhook_url).enqueue(title, attachments)
 
     def _reset_scan_schedule(self, task):
         scan = {
@@ -151,10 +218,25 @@ class BaseTask:
         task["progress"] = next_progress
         if next_progress == TaskProgress.DELETED.name:
             if task.get("session"):
-                Scanner(json.loads(task["session"])).delete()
+                session = json.loads(task["session"])
+                Scanner(session).delete(keep_scanner=self._is_scanner_shared(task, session))
                 app.logger.info("Scan deleted successfully, task={}".format(task))
         TaskTable.update(task).where(TaskTable.id == task["id"]).execute()
 
+    def _is_scanner_shared(self, task, session):
+        # A scanner is in use by every task assigned to it until that task is deleted, whether it is still
+        # pending, running or has its report left to fetch
+        return (
+            TaskTable.select(TaskTable.id)
+            .where(
+                (TaskTable.ov_host == session.get("ov_host"))
+                & (TaskTable.ov_port == session.get("ov_port"))
+                & (TaskTable.progress != TaskProgress.DELETED.name)
+                & (TaskTable.id != task["id"])
+            )
+            .exists()
+        )
+
     def _process(self, task):
         app.logger.exception("Error, needs to override `_process` method")
 
@@ -163,6 +245,27 @@ class PendingTask(BaseTask):
     def __init__(self):
         super().__init__(TaskProgress.PENDING.name)
 
+    def handle(self):
+        # Count once per pass, and track launched scans in `_process`
+        self.running_task_num = self._get_running_task_count()
+        super().handle()
+        self._refill_scanner_pool()
+        return True
+
+    def _refill_scanner_pool(self):
+        # Provision scanners for the next launches. Every process runs this pass, so the lock lets only one
+        # of them count and fill the pool at a time
+        lock_query = "SELECT GET_LOCK(%s, 0)"
+        if not db.database.execute_sql(lock_query, (SCANNER_POOL_LOCK_NAME,)).fetchone()[0]:
+            return
+
+        try:
+            Scanner.refill_pool()
+        except Exception as error:
+            app.logger.exception("Failed to refill scanner pool: {}".format(error))
+        finally:
+            db.database.execute_sql("SELECT RELEASE_LOCK(%s)", (SCANNER_POOL_LOCK_NAME,))
+
     def add(self, entry):
         entry["progress"] = TaskProgress.PENDING.name
         task = TaskTable(**entry)
@@ -170,16 +273,64 @@ class PendingTask(BaseTask):
         return task
 
     def _get_running_task_count(self):
-        task_query = TaskTable.select(fn.Count(TaskTable.id).alias("count")).where(
+        return PendingTask.get_running_task_query().dicts().get()["count"]
+
+    @staticmethod
+    def get_running_task_query():
+        return TaskTable.select(fn.Count(TaskTable.id).alias("count")).where(
             TaskTable.progress == TaskProgress.RUNNING.name
         )
-        return task_query.dicts().get()["count"]
+
+    def _get_shared_scanner_session(self):
+        if SCANNER_MAX_SCANS_PER_INSTANCE <= 1:
+            return None
+
+        # Pending tasks given a scanner on an earlier pass count as well, as they launch on it next
+        is_assigned = TaskTable.progress.in_([TaskProgress.PENDING.name, TaskProgress.RUNNING.name]) & (
+            TaskTable.ov_host != ""
+        )
+        scan_count = fn.Count(TaskTable.id)
+        scanner_query = (
+            TaskTable.select(TaskTable.ov_host, TaskTable.ov_port, scan_count.alias("scan_count"))
+            .where(is_assigned)
+            .group_by(TaskTable.ov_host, TaskTable.ov_port)
+            .having(scan_count < SCANNER_MAX_SCANS_PER_INSTANCE)
+            # Fill up the busiest scanner first, so that the others can be released sooner
+            .order_by(scan_count.desc())
+            .limit(1)
+        )
+        scanner = scanner_query.dicts().first()
+        if not scanner:
+            return None
+
+        task = (
+            TaskTable.select(TaskTable.session)
+            .where(
+                is_assigned
+                & (TaskTable.ov_host == scanner["ov_host"])
+                & (TaskTable.ov_port == scanner["ov_port"])
+            )
+            .dicts()
+            .first()
+        )
+        session = json.loads(task["session"])
+        app.logger.info(
+            "Packing scan onto scanner {}, running {} scan(s).".format(
+                session["ov_deployment_id"], scanner["scan_count"]
+            )
+        )
+        return {
+            "ov_deployment_id": session["ov_deployment_id"],
+            "ov_host": session["ov_host"],
+            "ov_port": session["ov_port"],
+        }
 
     def _process(self, task):
-        running_task_num = self._get_running_task_count()
         max_parallel_scan_num = int(os.getenv("SCAN_MAX_PARALLEL_SESSION", "1"))
-        if running_task_num >= max_parallel_scan_num:
-            app.logger.info("Abandoned to launch scan, already running {} task(s).".format(running_task_num))
+        if self.running_task_num >= max_parallel_scan_num:
+            app.logger.info(
+                "Abandoned to launch scan, already running {} task(s).".format(self.running_task_num)
+            )
             return False
 
         start_at = task["start_at"].replace(tzinfo=pytz.utc)
@@ -200,10 +351,13 @@ class PendingTask(BaseTask):
         if task.get("session"):
             scanner = Scanner(json.loads(task["session"]))
         else:
-            scanner = Scanner()
+            scanner = Scanner(self._get_shared_scanner_session())
 
         session = scanner.create()
         task["session"] = json.dumps(session)
+        # Kept apart from the session, so that tasks sharing a scanner can be found by query
+        task["ov_host"] = session["ov_host"] or ""
+        task["ov_port"] = session["ov_port"] or 0
 
         if not scanner.is_ready():
             # Skip the task if scanner is not ready
@@ -217,6 +371,7 @@ class PendingTask(BaseTask):
             ScanTable.update({"started_at": now}).where(ScanTable.task_uuid == task["uuid"]).execute()
             app.logger.info("Scan launched successfully, task={task}".format(task=task))
             self._update(task, next_progress=TaskProgress.RUNNING.name)
+            self.running_task_num += 1
         except ScanServerException:
             # FIXME: Need to handle persistent server exception here
             app.logger.warn(
@@ -227,8 +382,17 @@ class PendingTask(BaseTask):
 
 
 class RunningTask(BaseTask):
+    # Status checks of this process still in flight, keyed by task ID, which may outlive a pass on timeout
+    status_check_jobs = {}
+
     def __init__(self):
         super().__init__(TaskProgress.RUNNING.name)
+        self.status_checks = {}
+
+    def handle(self):
+        super().handle()
+        self._wait_status_checks()
+        return True
 
     def _update(self, task, next_progress):
 
@@ -258,13 +422,55 @@ class RunningTask(BaseTask):
             self._update(task, next_progress=TaskProgress.FAILED.name)
             return True
 
+        if task["id"] in RunningTask.status_check_jobs:
+            app.logger.info("Scan status check of the previous pass ongoing, task={}".format(task))
+            return True
+
+        # Scanners are polled concurrently, and the results are applied in `_wait_status_checks`
+        future = status_check_executor.submit(self._check_status, app._get_current_object(), task)
+        RunningTask.status_check_jobs[task["id"]] = future
+        future.add_done_callback(lambda _future: RunningTask.status_check_jobs.pop(task["id"], None))
+        self.status_checks[future] = (task, time.time())
+        return True
+
+    def _check_status(self, flask_app, task):
+        with flask_app.app_context():
+            return Scanner(json.loads(task["session"])).check_status(timeout=STATUS_CHECK_TIMEOUT)
+
+    def _wait_status_checks(self):
+        pending = set(self.status_checks)
+
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, timeout=1, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+
+            # Database updates are applied one by one in the handler thread
+            for future in done:
+                task, _submitted_at = self.status_checks[future]
+                try:
+                    self._apply_status(task, future)
+                except Exception as error:
+                    app.logger.exception("Exception, task={}, error={}".format(task, error))
+
+            # Checks waiting in the queue count against the deadline too, as they are submitted at once
+            now = time.time()
+            for future in list(pending):
+                task, submitted_at = self.status_checks[future]
+                if now - submitted_at > STATUS_CHECK_TIMEOUT:
+                    app.logger.warn("Scan status check timed out, task={}".format(task))
+                    pending.remove(future)
+
+        self.status_checks = {}
+
+    def _apply_status(self, task, future):
         try:
-            status = Scanner(json.loads(task["session"])).check_status()
+            status = future.result()
         except ScanServerException as error:
             app.logger.exception("Exception, task={}, error={}".format(task, error))
             task["error_reason"] = "Scan was terminated due to server down."
             self._update(task, next_progress=TaskProgress.FAILED.name)
-            return True
+            return
 
         if status == ScanStatus.STOPPED:
             app.logger.info("Scan stopped successfully, task={task}".format(task=task))
@@ -276,56 +482,246 @@ class RunningTask(BaseTask):
         else:
             app.logger.info("Scan ongoing, status={}, task={}".format(status, task))
 
-        return True
-
 
 class StoppedTask(BaseTask):
     def __init__(self):
         super().__init__(TaskProgress.STOPPED.name)
 
+    # Reports parsed by the process pool of this process, keyed by task ID
+    parse_jobs = {}
+    parse_executor = None
+
+    def handle(self):
+        self.deadline = time.time() + REPORT_PASS_TIME_BUDGET
+        self.parse_futures = {}
+        super().handle()
+        self._wait_for_parsed()
+        return True
+
     def _process(self, task):
+        if task["id"] in StoppedTask.parse_jobs:
+            app.logger.info("Report parsing ongoing, task={}".format(task))
+            return True
+
+        if time.time() >= self.deadline:
+            app.logger.info("Time budget of the pass is used up, leave remaining reports to the next pass.")
+            return False
+
+        # Lease the task, so that other processes do not parse the same report meanwhile
+        now = datetime.utcnow()
+        is_leased = (
+            TaskTable.update(parse_lease_until=now + timedelta(seconds=REPORT_PARSE_TIMEOUT))
+            .where(
+                (TaskTable.id == task["id"])
+                & (TaskTable.progress == TaskProgress.STOPPED.name)
+                & (TaskTable.parse_lease_until < now)
+            )
+            .execute()
+        )
+        if not is_leased:
+            app.logger.info("Report parsing ongoing in another process, task={}".format(task))
+            return True
+
         storage = Storage()
         key = SCAN_REPORT_KEY_NAME.format(
             audit_id=task["audit_id"], scan_id=task["scan_id"], task_uuid=task["uuid"].hex
         )
 
+        if storage.exists(key):
+            # Archived by an earlier pass whose parse was lost, e.g. by the process being shut down
+            app.logger.info("Report has been archived, parse it again, task={}".format(task))
+            try:
+                future = StoppedTask._submit_parse(store_archived_report, key, task)
+            except Exception:
+                self._release_lease(task)
+                raise
+            StoppedTask.parse_jobs[task["id"]] = future
+            self.parse_futures[future] = task
+            return True
+
+        raw_report = tempfile.NamedTemporaryFile(delete=False)
+        future = None
         try:
-            raw_report = Scanner(json.loads(task["session"])).get_report()
-            storage.store(key, raw_report)
-            report = Scanner.parse_report(raw_report)
+            with raw_report:
+                Scanner(json.loads(task["session"])).get_report(raw_report)
+                raw_report.seek(0)
+                storage.store(key, raw_report)
+            # Parsing is CPU bound, so it runs in a separate process, which removes the file once parsed
+            future = StoppedTask._submit_parse(store_report_file, raw_report.name, task)
         except ScanServerException as error:
             app.logger.exception("Exception, task={}, error={}".format(task, error))
             task["error_reason"] = "Report download failed due to server down."
             self._update(task, next_progress=TaskProgress.FAILED.name)
             return True
+        except Exception:
+            self._release_lease(task)
+            raise
+        finally:
+            if future is None:
+                os.remove(raw_report.name)
+
+        StoppedTask.parse_jobs[task["id"]] = future
+        self.parse_futures[future] = task
+        app.logger.info("Report parsing started, task={}".format(task))
+        return True
 
-        with db.database.atomic():
-            self._reset_scan_schedule(task)
-            for vuln in report["vulns"]:
-                VulnTable.insert(vuln).on_conflict_ignore().execute()
-            ResultTable.update(scan_id=None).where(ResultTable.scan_id == task["scan_id"]).execute()
-            results = report["results"]
-            for result in results:
-                result["scan_id"] = task["scan_id"]
-            ResultTable.insert_many(results).execute()
-
-        show_result_query = (
-            ResultTable.select(
-                ResultTable.oid, ResultTable.name, ResultTable.host, ResultTable.port, VulnTable.fix_required
+    def _wait_for_parsed(self):
+        # App Engine does not keep work running after the response to the cron request, so the pass waits
+        # for the reports it has started to parse, and commits them by itself
+        pending_tasks = dict(self.parse_futures)
+        try:
+            for future in concurrent.futures.as_completed(
+                self.parse_futures, timeout=max(self.deadline - time.time(), 0)
+            ):
+                task = pending_tasks.pop(future)
+                try:
+                    self._commit_report(task, future)
+                except Exception as error:
+                    app.logger.exception("Exception, task={}, error={}".format(task, error))
+                finally:
+                    StoppedTask.parse_jobs.pop(task["id"], None)
+        except concurrent.futures.TimeoutError:
+            # Committed once parsed while this process lives on. Otherwise the lease expires, and a later
+            # pass parses the archived report again
+            for future, task in pending_tasks.items():
+                app.logger.info("Report parsing continues after the pass, task={}".format(task))
+                future.add_done_callback(functools.partial(self._on_parsed, app._get_current_object(), task))
+
+    @staticmethod
+    def _submit_parse(store_func, source, task):
+        try:
+            return StoppedTask._get_parse_executor().submit(store_func, source, task["scan_id"], task)
+        except concurrent.futures.BrokenExecutor:
+            # A parser process died abruptly, e.g. by running out of memory, so start over with a new pool
+            StoppedTask.parse_executor = None
+            return StoppedTask._get_parse_executor().submit(store_func, source, task["scan_id"], task)
+
+    @staticmethod
+    def _get_parse_executor():
+        if StoppedTask.parse_executor is None:
+            StoppedTask.parse_executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=REPORT_PARSE_MAX_WORKERS,
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=init_report_parser,
+                initargs=get_report_parser_initargs(),
             )
-            .join(VulnTable, on=(VulnTable.oid == ResultTable.oid))
-            .where(ResultTable.scan_id == task["scan_id"])
-            .order_by(ResultTable.oid.desc())
-        )
+        return StoppedTask.parse_executor
+
+    def _release_lease(self, task):
+        TaskTable.update(parse_lease_until=Utils.get_default_datetime()).where(
+            TaskTable.id == task["id"]
+        ).execute()
+
+    def _on_parsed(self, flask_app, task, future):
+        # Called back in the thread of the process pool, so hand off DB writes to the commit thread
+        report_commit_executor.submit(self._commit, flask_app, task, future)
+
+    def _commit(self, flask_app, task, future):
+        with flask_app.app_context():
+            try:
+                self._commit_report(task, future)
+            except Exception as error:
+                app.logger.exception("Exception, task={}, error={}".format(task, error))
+            finally:
+                StoppedTask.parse_jobs.pop(task["id"], None)
+                db.close_db(None)
+
+    def _commit_report(self, task, future):
+        # Results have been stored by the parser process, which leaves the rest of the task to this process
+        try:
+            is_stored = future.result()
+        except PeeweeException:
+            # Left to the lease to expire, so that a later pass retries from the archived report
+            raise
+        except Exception as error:
+            app.logger.exception("Report parse failed, task={}, error={}".format(task, error))
+            task["error_reason"] = "Report parse failed."
+            self._update(task, next_progress=TaskProgress.FAILED.name)
+            return
+
+        if not is_stored:
+            app.logger.info("Task is no longer stopped, skip storing report, task={}".format(task))
+            return
+
+        try:
+            # Kept on the scanner until committed, so that a retry can download it again if archiving failed
+            Scanner(json.loads(task["session"])).delete_report()
+        except Exception as error:
+            app.logger.warn("Failed to delete report from scanner, task={}, error={}".format(task, error))
 
         results = []
-        for result in show_result_query.dicts():
+        for result in StoppedTask.get_result_query(task["scan_id"]).dicts():
             results.append(result)
 
         task["results"] = results
         task["error_reason"] = ""
         self._update(task, next_progress=TaskProgress.DELETED.name)
-        return True
+
+    @staticmethod
+    def get_result_query(scan_id):
+        return (
+            ResultTable.select(
+                ResultTable.oid, ResultTable.name, ResultTable.host, ResultTable.port, VulnTable.fix_required
+            )
+            .join(VulnTable, on=(VulnTable.oid == ResultTable.oid))
+            .where(ResultTable.scan_id == scan_id)
+            .order_by(ResultTable.oid.desc())
+        )
+
+    @staticmethod
+    def store_report(scan_id, results):
+        """Store results given by an iterable in batches, so that a report is never held in memory at once"""
+        started_at = time.time()
+
+        # Results of the scan are replaced, so take them out of the vulnerability catalog first
+        ScanResource.detach_results([scan_id])
+
+        # The catalog has an entry per vulnerability, which is far fewer than the results
+        catalog = {}
+        result_count = 0
+        for batch in chunked(results, RESULT_INSERT_BATCH_SIZE):
+            for result in batch:
+                result["scan_id"] = scan_id
+                StoppedTask._add_to_vuln_catalog(catalog, result)
+            ResultTable.insert_many(batch).execute()
+            result_count += len(batch)
+
+        # Upserted in the order of OIDs, so that processes storing reports at once do not deadlock
+        vulns = sorted(catalog.values(), key=lambda vuln: vuln["oid"])
+        for batch in chunked(vulns, VULN_INSERT_BATCH_SIZE):
+            VulnTable.insert_many(batch).on_conflict(
+                preserve=[
+                    VulnTable.name,
+                    VulnTable.cvss_base,
+                    VulnTable.cve,
+                    VulnTable.description,
+                    VulnTable.last_seen_at,
+                ],
+                update={VulnTable.occurrences: VulnTable.occurrences + fn.VALUES(VulnTable.occurrences)},
+            ).execute()
+
+        elapsed = time.time() - started_at
+        rows = len(vulns) + result_count
+        app.logger.info(
+            "Stored {} vuln(s) and {} result(s) in {:.3f} sec ({:.0f} rows/sec), scan_id={}".format(
+                len(vulns), result_count, elapsed, rows / max(elapsed, 0.001), scan_id
+            )
+        )
+
+    @staticmethod
+    def _add_to_vuln_catalog(catalog, result):
+        vuln = catalog.get(result["oid"])
+        if vuln is None:
+            now = datetime.utcnow()
+            vuln = {"oid": result["oid"], "occurrences": 0, "first_seen_at": now, "last_seen_at": now}
+            catalog[result["oid"]] = vuln
+
+        # Described by the latest result
+        vuln["name"] = result["name"]
+        vuln["cvss_base"] = result["cvss_base"]
+        vuln["cve"] = result["cve"]
+        vuln["description"] = result["description"]
+        vuln["occurrences"] += 1
 
 
 class FailedTask(BaseTask):
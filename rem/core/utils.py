@@ -1,19 +1,198 @@
+import base64
 import binascii
+import bisect
+import collections
+import concurrent.futures
+import csv
+import functools
 import hashlib
+import io
 import ipaddress
+import json
 import os
 import re
 import socket
+import threading
+import time
+import zlib
 from datetime import datetime
 from urllib.parse import urlparse
 
 import validators
+from flask import Response
 from flask import current_app as app
+from flask import request
+from flask import stream_with_context
 
 PASSWORD_SALT = os.getenv("PASSWORD_SALT", "password-salt")
 PASSWORD_HASH_ALG = "sha256"
 PASSWORD_ITERATION = 1000
 SLACK_DOMAIN = "slack.com"
+CSV_CHUNK_SIZE = 64 * 1024
+CSV_GZIP_LEVEL = 6
+DNS_RESOLVE_MAX_WORKERS = int(os.getenv("DNS_RESOLVE_MAX_WORKERS", "8"))
+DNS_BULK_RESOLVE_MAX_WORKERS = int(os.getenv("DNS_BULK_RESOLVE_MAX_WORKERS", "8"))
+DNS_RESOLVE_TIMEOUT = float(os.getenv("DNS_RESOLVE_TIMEOUT", "3"))
+DNS_CACHE_SIZE = int(os.getenv("DNS_CACHE_SIZE", "10000"))
+DNS_CACHE_TTL = int(os.getenv("DNS_CACHE_TTL", "300"))
+DNS_NEGATIVE_CACHE_TTL = int(os.getenv("DNS_NEGATIVE_CACHE_TTL", "30"))
+
+
+class IPRangeTable:
+    """Sorted table of merged IPv4/IPv6 address intervals, which looks up an address by binary search"""
+
+    IPV4_MAPPED_PREFIX = 0xFFFF << 32
+
+    def __init__(self, ip_ranges):
+        intervals = {socket.AF_INET: [], socket.AF_INET6: []}
+        for ip_range in ip_ranges:
+            network = ipaddress.ip_network(ip_range.strip())
+            family = socket.AF_INET if network.version == 4 else socket.AF_INET6
+            intervals[family].append((int(network.network_address), int(network.broadcast_address)))
+
+        self.starts = {}
+        self.ends = {}
+        for family, family_intervals in intervals.items():
+            starts = []
+            ends = []
+            for start, end in sorted(family_intervals):
+                if ends and start <= ends[-1] + 1:
+                    ends[-1] = max(ends[-1], end)
+                else:
+                    starts.append(start)
+                    ends.append(end)
+            self.starts[family] = starts
+            self.ends[family] = ends
+
+    def __contains__(self, ip_str):
+        family = socket.AF_INET6 if ":" in ip_str else socket.AF_INET
+        try:
+            ip = int.from_bytes(socket.inet_pton(family, ip_str), "big")
+        except (OSError, ValueError):
+            return False
+
+        if self._contains(family, ip):
+            return True
+        if family == socket.AF_INET6 and ip >> 32 == IPRangeTable.IPV4_MAPPED_PREFIX >> 32:
+            return self._contains(socket.AF_INET, ip & 0xFFFFFFFF)
+        return False
+
+    def _contains(self, family, ip):
+        i = bisect.bisect_right(self.starts[family], ip) - 1
+        return i >= 0 and ip <= self.ends[family][i]
+
+
+class HostLookup:
+    """Lookup of a host name on a resolver pool, which records when it starts running"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.started_at = None
+        self.future = None
+
+    def run(self, host):
+        self.started_at = time.monotonic()
+        self.started.set()
+        return HostResolver._lookup(host)
+
+
+class HostResolver:
+    """Resolves host names on thread pools, caching both resolvable and unresolvable answers.
+
+    Each lookup is given `timeout` seconds from when it starts running, and is reported as timed out
+    rather than unresolvable past that. It keeps running in its pool though, and concurrent callers
+    for the same host share it. Bulk lookups run on a pool of their own, so that a large bulk request
+    never keeps a single lookup waiting in the queue.
+    """
+
+    TIMED_OUT = None
+
+    def __init__(self, max_workers, bulk_max_workers, timeout, size, ttl, negative_ttl):
+        self.timeout = timeout
+        self.size = size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.max_workers = {False: max(max_workers, 1), True: max(bulk_max_workers, 1)}
+        self.pending = {False: {}, True: {}}
+        self.executors = {
+            False: concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers[False], thread_name_prefix="resolver"
+            ),
+            True: concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers[True], thread_name_prefix="bulk-resolver"
+            ),
+        }
+
+    def is_resolvable(self, host):
+        return self.resolve_many([host])[host]
+
+    def resolve_many(self, hosts):
+        """Return whether each host is resolvable, or `TIMED_OUT` if its lookup did not finish in time"""
+        is_bulk = len(set([host.lower() for host in hosts])) > 1
+        pending = self.pending[is_bulk]
+        results = {}
+        lookups = {}
+        new_lookups = []
+
+        with self.lock:
+            for host in hosts:
+                key = host.lower()
+                if key in lookups or host in results:
+                    continue
+                entry = self.entries.get(key)
+                if entry is not None and entry["expires_at"] > time.monotonic():
+                    self.entries.move_to_end(key)
+                    results[host] = entry["resolvable"]
+                    continue
+                lookup = pending.get(key)
+                if lookup is None:
+                    lookup = HostLookup()
+                    lookup.future = self.executors[is_bulk].submit(lookup.run, key)
+                    pending[key] = lookup
+                    new_lookups.append((key, lookup))
+                lookups[key] = lookup
+
+        # Callbacks may run right away in this thread, so they are attached outside the lock
+        for key, lookup in new_lookups:
+            lookup.future.add_done_callback(functools.partial(self._on_resolved, pending, key))
+
+        # Lookups queued behind others are waited for to start as many rounds as the pool takes to run them
+        rounds = -(-len(lookups) // self.max_workers[is_bulk])
+        start_deadline = time.monotonic() + self.timeout * rounds
+        for host in hosts:
+            if host not in results:
+                results[host] = self._wait(host, lookups[host.lower()], start_deadline)
+        return results
+
+    def _wait(self, host, lookup, start_deadline):
+        if lookup.started.wait(max(start_deadline - time.monotonic(), 0)):
+            try:
+                return lookup.future.result(max(lookup.started_at + self.timeout - time.monotonic(), 0))
+            except concurrent.futures.TimeoutError:
+                pass
+        app.logger.info("DNS lookup timed out: host={}".format(host))
+        return HostResolver.TIMED_OUT
+
+    def _on_resolved(self, pending, key, future):
+        resolvable = future.result()
+        ttl = self.ttl if resolvable else self.negative_ttl
+        with self.lock:
+            pending.pop(key, None)
+            if self.size <= 0 or ttl <= 0:
+                return
+            self.entries[key] = {"resolvable": resolvable, "expires_at": time.monotonic() + ttl}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    @staticmethod
+    def _lookup(host):
+        try:
+            return len(socket.gethostbyname(host)) > 0
+        except Exception:
+            return False
 
 
 class Utils:
@@ -22,15 +201,13 @@ class Utils:
         if len(app.config["PERMITTED_SOURCE_IP_RANGES"]) == 0:
             return True
 
-        permitted_ip_ranges = app.config["PERMITTED_SOURCE_IP_RANGES"].split(",")
-        source_ip = ipaddress.ip_address(source_ip_str)
-
-        for permitted_ip_range in permitted_ip_ranges:
-            permitted_ip_network = ipaddress.ip_network(permitted_ip_range)
-            if source_ip in permitted_ip_network:
-                return True
+        return source_ip_str in Utils.get_ip_range_table(app.config["PERMITTED_SOURCE_IP_RANGES"])
 
-        return False
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def get_ip_range_table(ip_ranges_str):
+        # Compiled once for each configuration value, so that a reloaded configuration takes effect
+        return IPRangeTable([ip_range for ip_range in ip_ranges_str.split(",") if ip_range.strip()])
 
     @staticmethod
     def load_env_from_config_file(config_file_path):
@@ -72,10 +249,11 @@ class Utils:
 
     @staticmethod
     def is_host_resolvable(value):
-        try:
-            return len(socket.gethostbyname(value)) > 0
-        except Exception:
-            return False
+        return host_resolver.is_resolvable(value)
+
+    @staticmethod
+    def resolve_hosts(values):
+        return host_resolver.resolve_many(values)
 
     @staticmethod
     def is_slack_url(value):
@@ -89,8 +267,25 @@ class Utils:
     def get_default_datetime():
         return datetime(1, 1, 1)
 
+    @staticmethod
+    def encode_cursor(values):
+        return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+        except (binascii.Error, ValueError):
+            raise ValueError("Invalid cursor: {}".format(cursor))
+        if not isinstance(values, list):
+            raise ValueError("Invalid cursor: {}".format(cursor))
+        return values
+
     @staticmethod
     def format_openvas_description(value):
+        if value is None:
+            # Nullable in both the vulnerability catalog and results
+            return ""
         desc = re.sub("\n{2,}", "\n", value)
         desc = re.sub(r"^(\w+)=", r"\1\n", desc)
         desc = re.sub(r"\|(\w+)=", r"\n\n\1\n", desc)
@@ -99,3 +294,48 @@ class Utils:
     @staticmethod
     def is_gcp():
         return bool(os.getenv("GAE_ENV", ""))
+
+    @staticmethod
+    def generate_csv(rows, columns, preamble=""):
+        buffer = io.StringIO()
+        buffer.write(preamble)
+        writer = csv.DictWriter(buffer, columns, extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            if buffer.tell() >= CSV_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    @staticmethod
+    def get_csv_response(rows, columns, preamble=""):
+        headers = {"Content-Type": "text/csv", "Content-Disposition": "attachment", "Vary": "Accept-Encoding"}
+        chunks = (chunk.encode("utf-8") for chunk in Utils.generate_csv(rows, columns, preamble))
+
+        if "gzip" in request.accept_encodings:
+            headers["Content-Encoding"] = "gzip"
+            chunks = Utils.compress_gzip(chunks)
+
+        # Keep request context (and DB connection) until the rows are fully streamed
+        return Response(response=stream_with_context(chunks), status=200, headers=headers)
+
+    @staticmethod
+    def compress_gzip(chunks):
+        compressor = zlib.compressobj(CSV_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+
+host_resolver = HostResolver(
+    DNS_RESOLVE_MAX_WORKERS,
+    DNS_BULK_RESOLVE_MAX_WORKERS,
+    DNS_RESOLVE_TIMEOUT,
+    DNS_CACHE_SIZE,
+    DNS_CACHE_TTL,
+    DNS_NEGATIVE_CACHE_TTL,
+)
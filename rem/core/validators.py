@@ -8,6 +8,7 @@ from marshmallow import validate
 from marshmallow import validates
 from marshmallow import validates_schema
 
+from .utils import HostResolver
 from .utils import Utils
 
 marshmallow = Marshmallow()
@@ -16,7 +17,9 @@ DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
 
 AUDIT_LIST_MAX_COUNT = 300
 AUDIT_GET_DEFAULT_COUNT = 10
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
 SCAN_MAX_COMMENT_LENGTH = 1000
+SCAN_VALIDATION_MAX_TARGETS = 100
 
 SCAN_SCHEDULABLE_DAYS_FROM_NOW = 10
 SCAN_MIN_DURATION_IN_SECONDS = 3600  # 1 hours
@@ -26,16 +29,36 @@ VULN_FIX_REQUIRED_STATUS = ["REQUIRED", "RECOMMENDED", "OPTIONAL", "UNDEFINED",
 
 class Validators:
     @staticmethod
-    def validate_target(value):
+    def validate_target(value, resolved_hosts=None):
         if Utils.is_ipv4(value):
             if not Utils.is_public_address(value):
                 raise ValidationError(ErrorReasonEnum.target_is_private_ip.name)
         elif Utils.is_domain(value):
-            if not Utils.is_host_resolvable(value):
+            if resolved_hosts is not None:
+                resolvable = resolved_hosts[value]
+            else:
+                resolvable = Utils.is_host_resolvable(value)
+            if resolvable is HostResolver.TIMED_OUT:
+                # Not cached as unresolvable, so the client may retry
+                raise ValidationError(ErrorReasonEnum.target_resolution_timed_out.name)
+            if not resolvable:
                 raise ValidationError(ErrorReasonEnum.could_not_resolve_target_fqdn.name)
         else:
             raise ValidationError(ErrorReasonEnum.target_is_not_fqdn_or_ipv4.name)
 
+    @staticmethod
+    def validate_targets(values):
+        # Resolve all domains at once so that validating many targets takes as long as the slowest lookup
+        resolved_hosts = Utils.resolve_hosts([value for value in values if Utils.is_domain(value)])
+
+        errors = {}
+        for value in values:
+            try:
+                Validators.validate_target(value, resolved_hosts)
+            except ValidationError as error:
+                errors[value] = error.messages
+        return errors
+
     def validate_slack_url(value):
         if not Utils.is_slack_url(value):
             raise ValidationError("Given Slack URL is invalid.")
@@ -48,6 +71,7 @@ class ErrorReasonEnum(IntFlag):
     could_not_resolve_target_fqdn = 3
     target_is_not_fqdn_or_ipv4 = 4
     target_is_scheduled = 5
+    target_resolution_timed_out = 6
 
     @property
     def name(self):
@@ -61,6 +85,14 @@ class PagenationInputSchema(marshmallow.Schema):
         validate=[validate.Range(min=1, max=AUDIT_LIST_MAX_COUNT)],
         missing=AUDIT_GET_DEFAULT_COUNT,
     )
+    cursor = marshmallow.String(required=False)
+
+    @validates("cursor")
+    def validate_cursor(self, value):
+        try:
+            Utils.decode_cursor(value)
+        except ValueError:
+            raise ValidationError("Given cursor is invalid.")
 
 
 class AuthInputSchema(marshmallow.Schema):
@@ -126,6 +158,14 @@ class ScanInputSchema(marshmallow.Schema):
         Validators.validate_target(value)
 
 
+class ScanValidationInputSchema(marshmallow.Schema):
+    targets = marshmallow.List(
+        marshmallow.String(),
+        required=True,
+        validate=[validate.Length(min=1, max=SCAN_VALIDATION_MAX_TARGETS)],
+    )
+
+
 class ScanUpdateSchema(marshmallow.Schema):
     target = marshmallow.String(required=False)
     start_at = marshmallow.DateTime(required=True)
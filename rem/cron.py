@@ -1,4 +1,5 @@
 import concurrent.futures
+import sys
 import time
 
 import requests
@@ -54,7 +55,20 @@ def invoke(endpoint):
     return requests.get(url, headers=headers)
 
 
+def schedule_in_process():
+    # Run task handlers directly in this process, waking up only when a task is due
+    from app import app
+    from core import TaskScheduler
+
+    with app.app_context():
+        TaskScheduler().run()
+
+
 def main():
+    if "--in-process" in sys.argv[1:]:
+        schedule_in_process()
+        return
+
     executor = concurrent.futures.ThreadPoolExecutor()
     executor.submit(handlePendingTask)
     executor.submit(handleRunningTask)
@@ -0,0 +1,101 @@
+"""Check that the hot queries of the application are served by indexes.
+
+Run against a migrated MySQL database with the usual DB_* environment variables:
+
+    pipenv run explain
+
+Queries are built by the same methods the application calls. The script prints the EXPLAIN plan of
+every query and exits with status 1 if a table is read by a full table scan, unless the table is small
+enough for MySQL to prefer a full scan over its candidate indexes.
+"""
+import sys
+from datetime import datetime
+
+from apis.audit import AuditDownload
+from apis.audit import AuditList
+from apis.vuln import VulneravilityList
+from apis.vuln import VulneravilityListDownload
+from app import app
+from core import AuditResource
+from core import PendingTask
+from core import ScanResource
+from core import StoppedTask
+from core import Utils
+from core import db
+
+FULL_SCAN_MAX_ROWS = 1000
+AUDIT_IDS = [1, 2, 3]
+SCAN_IDS = [1, 2, 3]
+
+
+def get_queries():
+    audit_cursor = Utils.encode_cursor([datetime(2019, 1, 1).isoformat(), 100])
+    vuln_cursor = Utils.encode_cursor(["1.3.6.1.4.1.25623.1.0.100000"])
+
+    return [
+        ("core.tasks.BaseTask.get_task_query", PendingTask().get_task_query()),
+        ("core.tasks.PendingTask.get_running_task_query", PendingTask.get_running_task_query()),
+        ("core.tasks.StoppedTask.get_result_query", StoppedTask.get_result_query(SCAN_IDS[0])),
+        (
+            "apis.audit.AuditList.get_page_query (page)",
+            AuditList.get_page_query({"submitted": False, "approved": False, "page": 1, "count": 10}),
+        ),
+        (
+            "apis.audit.AuditList.get_page_query (cursor, unsafe only)",
+            AuditList.get_page_query(
+                {"unsafe_only": True, "approved": True, "cursor": audit_cursor, "count": 10}
+            ),
+        ),
+        ("core.resources.AuditResource.get_contact_query", AuditResource.get_contact_query(AUDIT_IDS)),
+        ("core.resources.AuditResource.get_scan_query", AuditResource.get_scan_query(AUDIT_IDS)),
+        ("core.resources.ScanResource.get_result_query", ScanResource.get_result_query(SCAN_IDS[0])),
+        ("apis.audit.AuditDownload.get_scan_query", AuditDownload.get_scan_query(AUDIT_IDS[0])),
+        ("apis.audit.AuditDownload.get_result_query", AuditDownload.get_result_query(SCAN_IDS, (1, 100))),
+        (
+            "apis.vuln.VulneravilityList.get_page_query",
+            VulneravilityList.get_page_query(
+                {"fix_required": "REQUIRED", "cursor": vuln_cursor, "count": 10}
+            ),
+        ),
+        (
+            "apis.vuln.VulneravilityListDownload.get_vuln_query",
+            VulneravilityListDownload.get_vuln_query(
+                {"fix_required": "REQUIRED"}, "1.3.6.1.4.1.25623.1.0.100000"
+            ),
+        ),
+    ]
+
+
+def explain(query):
+    sql, params = query.sql()
+    cursor = db.database.execute_sql("EXPLAIN " + sql, params)
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def main():
+    failures = []
+
+    with app.app_context():
+        for name, query in get_queries():
+            print(name)
+            for plan in explain(query):
+                print(
+                    "  table={table} type={type} possible_keys={possible_keys} key={key} rows={rows}".format(
+                        **plan
+                    )
+                )
+                # Tables are aliased by peewee, so report the alias of each table read by a full scan
+                if plan["type"] == "ALL" and (
+                    plan["possible_keys"] is None or plan["rows"] > FULL_SCAN_MAX_ROWS
+                ):
+                    failures.append("{}: table {} read by full scan".format(name, plan["table"]))
+
+    if failures:
+        print("\n".join(["", "Queries without index:"] + failures))
+        sys.exit(1)
+    print("\nAll queries use an index.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+ALTER TABLE `task` ADD INDEX `tasktable_progress_updated_at` (`progress`, `updated_at`);
+ALTER TABLE `scan` ADD INDEX `scantable_audit_id_processed` (`audit_id`, `processed`);
+ALTER TABLE `result` ADD INDEX `resulttable_oid` (`oid`);
+ALTER TABLE `vuln` ADD INDEX `vulntable_fix_required_oid` (`fix_required`, `oid`);
\ No newline at end of file
@@ -0,0 +1 @@
+ALTER TABLE `task` ADD COLUMN `parse_lease_until` datetime NOT NULL DEFAULT '0001-01-01 00:00:00' AFTER `results`;
@@ -0,0 +1 @@
+ALTER TABLE `audit` ADD INDEX `audittable_updated_at` (`updated_at`);
@@ -0,0 +1,19 @@
+ALTER TABLE `vuln`
+  ADD COLUMN `name` varchar(255) NULL,
+  ADD COLUMN `cvss_base` varchar(255) NULL,
+  ADD COLUMN `cve` varchar(255) NULL,
+  ADD COLUMN `description` text NULL,
+  ADD COLUMN `occurrences` int(11) NOT NULL DEFAULT 0,
+  ADD COLUMN `first_seen_at` datetime NOT NULL DEFAULT '0001-01-01 00:00:00',
+  ADD COLUMN `last_seen_at` datetime NOT NULL DEFAULT '0001-01-01 00:00:00';
+
+UPDATE `vuln` AS `v`
+  INNER JOIN (
+    SELECT `oid`, COUNT(`scan_id`) AS `occurrences`, MIN(`created_at`) AS `first_seen_at`,
+      MAX(`created_at`) AS `last_seen_at`, MAX(`id`) AS `last_result_id`
+    FROM `result` GROUP BY `oid`
+  ) AS `s` ON `v`.`oid` = `s`.`oid`
+  INNER JOIN `result` AS `r` ON `r`.`id` = `s`.`last_result_id`
+SET `v`.`name` = `r`.`name`, `v`.`cvss_base` = `r`.`cvss_base`, `v`.`cve` = `r`.`cve`,
+  `v`.`description` = `r`.`description`, `v`.`occurrences` = `s`.`occurrences`,
+  `v`.`first_seen_at` = `s`.`first_seen_at`, `v`.`last_seen_at` = `s`.`last_seen_at`;
@@ -0,0 +1,9 @@
+ALTER TABLE `task`
+  ADD COLUMN `ov_host` varchar(255) NOT NULL DEFAULT '' AFTER `parse_lease_until`,
+  ADD COLUMN `ov_port` int(11) NOT NULL DEFAULT 0 AFTER `ov_host`,
+  ADD INDEX `tasktable_ov_host_ov_port` (`ov_host`, `ov_port`);
+
+UPDATE `task`
+SET `ov_host` = IFNULL(NULLIF(JSON_UNQUOTE(JSON_EXTRACT(`session`, '$.ov_host')), 'null'), ''),
+  `ov_port` = IFNULL(NULLIF(JSON_UNQUOTE(JSON_EXTRACT(`session`, '$.ov_port')), 'null'), 0)
+WHERE `session` <> '' AND `progress` <> 'DELETED';
@@ -0,0 +1,11 @@
+CREATE TABLE IF NOT EXISTS `slack_message` (
+  `id` int(11) NOT NULL AUTO_INCREMENT,
+  `webhook_url` varchar(255) NOT NULL,
+  `payload` text NOT NULL,
+  `attempts` int(11) NOT NULL DEFAULT 0,
+  `claim_token` varchar(255) NOT NULL DEFAULT '',
+  `next_attempt_at` datetime NOT NULL,
+  `created_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  KEY `slackmessagetable_next_attempt_at` (`next_attempt_at`)
+);
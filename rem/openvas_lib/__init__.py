@@ -59,6 +59,16 @@ THE POSSIBILITY OF SUCH DAMAGE.
 # Stand alone parser
 #
 # ------------------------------------------------------------------------------
+_PORT_REGEX_SPECIFIC = re.compile("([\w\d\s]*)\(([\d]+)/([\w\W\d]+)\)")
+_PORT_REGEX_GENERIC = re.compile("([\w\d\s]*)/([\w\W\d]+)")
+_CVSS_REGEX = re.compile("(cvss_base_vector=[\s]*)([\w:/]+)")
+_VULNERABILITY_IDS = ("cve", "bid", "bugtraq")
+
+# Sub nodes of NVT tag which are stored into OpenVASNVT properties
+_NVT_TAGS = frozenset(x for x in dir(OpenVASNVT) if not x.startswith("_") and x != "risk_levels")
+_NVT_LIST_TAGS = frozenset(("cve", "bid", "bugtraq", "xrefs", "tags"))
+
+
 def report_parser_from_text(text, ignore_log_info=True):
     """
 	This functions transform XML OpenVas file report to OpenVASResult object structure.
@@ -156,258 +166,279 @@ def report_parser(path_or_file, ignore_log_info=True):
     if "id" not in list(xml.keys()):
         raise ValueError("XML format is not valid, doesn't contains id attribute.")
 
-    # Regex
-    port_regex_specific = re.compile("([\w\d\s]*)\(([\d]+)/([\w\W\d]+)\)")
-    port_regex_generic = re.compile("([\w\d\s]*)/([\w\W\d]+)")
-    cvss_regex = re.compile("(cvss_base_vector=[\s]*)([\w:/]+)")
-    vulnerability_IDs = ("cve", "bid", "bugtraq")
-
     m_return = []
     m_return_append = m_return.append
 
     # All the results
     for l_results in xml.findall(".//result"):
-        l_partial_result = OpenVASResult()
-
-        # Id
-        l_vid = None
-        try:
-            l_vid = l_results.get("id")
-            l_partial_result.id = l_vid
-        except TypeError as e:
-            logging.warning("%s is not a valid vulnerability ID, skipping vulnerability..." % l_vid)
-            logging.debug(e)
+        l_partial_result = _parse_result(l_results, ignore_log_info)
+        if l_partial_result is None:
             continue
 
-        # --------------------------------------------------------------------------
-        # Filter invalid vulnerability
-        # --------------------------------------------------------------------------
-        threat = l_results.find("threat")
-        if threat is None:
+        # Add to the return values
+        m_return_append(l_partial_result)
+
+    return m_return
+
+
+def report_parser_iter(path_or_file, ignore_log_info=True):
+    """
+	This functions transform XML OpenVas file report to OpenVASResult objects one by one.
+
+	Unlike `report_parser`, the report is parsed incrementally and each <result> element
+	is discarded once it has been processed, so the whole report tree is never held in memory.
+
+	>>> for result in report_parser_iter('/home/my_user/openvas_result.xml'):
+	...     print(result.nvt.oid)
+
+	:param path_or_file: path or file object (binary or text) of xml report.
+	:type path_or_file: str | file
+
+	:param ignore_log_info: Ignore Threats with Log and Debug info
+	:type ignore_log_info: bool
+
+	:raises: etree.ParseError, IOError, TypeError, ValueError
+
+	:return: generator of OpenVASResult structures.
+	:rtype: generator(OpenVASResult)
+	"""
+    if isinstance(path_or_file, str):
+        if not os.path.exists(path_or_file):
+            raise IOError("File %s not exits." % path_or_file)
+        if not os.path.isfile(path_or_file):
+            raise IOError("%s is not a file." % path_or_file)
+    elif not hasattr(path_or_file, "read"):
+        raise TypeError("Expected str or file, got '%s' instead" % type(path_or_file))
+
+    # Stack of open elements, from the root element to the current one
+    l_elements = []
+    l_report_checked = False
+
+    try:
+        for l_event, l_element in etree.iterparse(path_or_file, events=("start", "end")):
+            if l_event == "start":
+                l_elements.append(l_element)
+
+                # Check valid xml format, the report may be wrapped by the response element
+                if not l_report_checked and not (len(l_elements) == 1 and "status" in l_element.keys()):
+                    if "id" not in l_element.keys():
+                        raise ValueError("XML format is not valid, doesn't contains id attribute.")
+                    l_report_checked = True
+                continue
+
+            l_elements.pop()
+            if l_element.tag != "result":
+                continue
+
+            l_partial_result = _parse_result(l_element, ignore_log_info)
+
+            # Discard processed results, except for the ones nested in another result
+            if l_elements and l_elements[-1].tag == "results":
+                del l_elements[-1][-1]
+
+            if l_partial_result is not None:
+                yield l_partial_result
+    except etree.ParseError:
+        raise etree.ParseError("Invalid XML file. Ensure file is correct and all tags are properly closed.")
+
+
+def _parse_result(l_results, ignore_log_info=True):
+    """
+	Transform a <result> element of an OpenVAS report into OpenVASResult object.
+
+	Values are checked here once, and the objects are made with the trusted
+	constructors, which skip the validation of each property setter.
+
+	:param l_results: <result> element to parse.
+	:type l_results: Element
+
+	:param ignore_log_info: Ignore Threats with Log and Debug info
+	:type ignore_log_info: bool
+
+	:return: OpenVASResult structure, or None if the result is skipped.
+	:rtype: OpenVASResult | None
+	"""
+
+    # Id
+    l_vid = l_results.get("id")
+    if l_vid is None:
+        logging.warning("%s is not a valid vulnerability ID, skipping vulnerability..." % l_vid)
+        return None
+
+    # --------------------------------------------------------------------------
+    # Filter invalid vulnerability
+    # --------------------------------------------------------------------------
+    threat = l_results.find("threat")
+    if threat is None:
+        logging.warning(
+            "Vulnerability %s can't has 'None' as thread value, skipping vulnerability..." % l_vid
+        )
+        return None
+    else:
+        # Valid threat?
+        if threat.text not in OpenVASResult.risk_levels:
             logging.warning(
-                "Vulnerability %s can't has 'None' as thread value, skipping vulnerability..." % l_vid
+                "%s is not a valid risk level for %s vulnerability. skipping vulnerability..."
+                % (threat.text, l_vid)
             )
-            continue
-        else:
-            # Valid threat?
-            if threat.text not in OpenVASResult.risk_levels:
+            return None
+
+    # Ignore log/debug messages, only get the results
+    if threat.text in ("Log", "Debug") and ignore_log_info is True:
+        return None
+
+    l_values = {"id": l_vid}
+
+    # For each result
+    for l_val in l_results:
+
+        l_tag = l_val.tag
+
+        # --------------------------------------------------------------------------
+        # Common properties: subnet, host, threat, severity, name
+        # --------------------------------------------------------------------------
+        if l_tag in ("subnet", "host", "threat", "severity", "name"):
+            if not isinstance(l_val.text, str):
                 logging.warning(
-                    "%s is not a valid risk level for %s vulnerability. skipping vulnerability..."
-                    % (threat.text, l_vid)
+                    "%s is not a valid value for %s property in %s vulnerability. skipping vulnerability..."
+                    % (l_val.text, l_tag, l_vid)
                 )
                 continue
+            l_values[l_tag] = l_val.text
 
-        # Ignore log/debug messages, only get the results
-        if threat.text in ("Log", "Debug") and ignore_log_info is True:
-            continue
+        elif l_tag == "description":
+            l_values["raw_description"] = l_val.text
 
-        # For each result
-        for l_val in l_results.getchildren():
-
-            l_tag = l_val.tag
-
-            # --------------------------------------------------------------------------
-            # Common properties: subnet, host, threat, raw_description
-            # --------------------------------------------------------------------------
-            if l_tag in ("subnet", "host", "threat"):
-                # All text vars can be processes both.
-                try:
-                    setattr(l_partial_result, l_tag, l_val.text)
-                except (TypeError, ValueError) as e:
-                    logging.warning(
-                        "%s is not a valid value for %s property in %s vulnerability. skipping vulnerability..."
-                        % (l_val.text, l_tag, l_partial_result.id)
-                    )
-                    logging.debug(e)
-                    continue
-
-            elif l_tag == "description":
-                try:
-                    setattr(l_partial_result, "raw_description", l_val.text)
-                except TypeError as e:
-                    logging.warning(
-                        "%s is not a valid description for %s vulnerability. skipping vulnerability..."
-                        % (l_val.text, l_vid)
-                    )
-                    logging.debug(e)
-                    continue
-
-            # --------------------------------------------------------------------------
-            # Port
-            # --------------------------------------------------------------------------
-            elif l_tag == "port":
-
-                # Looking for port as format: https (443/tcp)
-                l_port = port_regex_specific.search(l_val.text)
-                if l_port:
-                    l_service = l_port.group(1)
-                    l_number = int(l_port.group(2))
-                    l_proto = l_port.group(3)
-
-                    try:
-                        l_partial_result.port = OpenVASPort(l_service, l_number, l_proto)
-                    except (TypeError, ValueError) as e:
-                        logging.warning(
-                            "%s is not a valid port for %s vulnerability. skipping vulnerability..."
-                            % (l_val.text, l_vid)
-                        )
-                        logging.debug(e)
-                        continue
-                else:
-                    # Looking for port as format: general/tcp
-                    l_port = port_regex_generic.search(l_val.text)
-                    if l_port:
-                        l_service = l_port.group(1)
-                        l_proto = l_port.group(2)
-
-                        try:
-                            l_partial_result.port = OpenVASPort(l_service, 0, l_proto)
-                        except (TypeError, ValueError) as e:
-                            logging.warning(
-                                "%s is not a valid port for %s vulnerability. skipping vulnerability..."
-                                % (l_val.text, l_vid)
-                            )
-                            logging.debug(e)
-                            continue
-
-            # --------------------------------------------------------------------------
-            # NVT
-            # --------------------------------------------------------------------------
-            elif l_tag == "nvt":
-
-                # The NVT Object
-                l_nvt_object = OpenVASNVT()
-                try:
-                    l_nvt_object.oid = l_val.attrib["oid"]
-                except TypeError as e:
-                    logging.warning(
-                        "%s is not a valid NVT oid for %s vulnerability. skipping vulnerability..."
-                        % (l_val.attrib["oid"], l_vid)
-                    )
-                    logging.debug(e)
-                    continue
-
-                # Sub nodes of NVT tag
-                l_nvt_symbols = [x for x in dir(l_nvt_object) if not x.startswith("_")]
-
-                for l_nvt in l_val.getchildren():
-                    l_nvt_tag = l_nvt.tag
-
-                    # For each xml tag...
-                    if l_nvt_tag in l_nvt_symbols:
-
-                        # For tags with content, like: <cert>blah</cert>
-                        if l_nvt.text:
-
-                            # For filter tags like <cve>NOCVE</cve>
-                            if l_nvt.text.startswith("NO"):
-                                try:
-                                    setattr(l_nvt_object, l_nvt_tag, "")
-                                except (TypeError, ValueError) as e:
-                                    logging.warning(
-                                        "Empty value is not a valid NVT value for %s property in %s vulnerability. skipping vulnerability..."
-                                        % (l_nvt_tag, l_vid)
-                                    )
-                                    logging.debug(e)
-                                    continue
-
-                            # Tags with valid content
-                            else:
-                                # --------------------------------------------------------------------------
-                                # Vulnerability IDs: CVE-..., BID..., BugTraq...
-                                # --------------------------------------------------------------------------
-                                if l_nvt_tag.lower() in vulnerability_IDs:
-                                    l_nvt_text = getattr(l_nvt, "text", "")
-                                    try:
-                                        setattr(l_nvt_object, l_nvt_tag, l_nvt_text.split(","))
-                                    except (TypeError, ValueError) as e:
-                                        logging.warning(
-                                            "%s value is not a valid NVT value for %s property in %s vulnerability. skipping vulnerability..."
-                                            % (l_nvt_text, l_nvt_tag, l_vid)
-                                        )
-                                        logging.debug(e)
-                                    continue
-
-                                else:
-                                    l_nvt_text = getattr(l_nvt, "text", "")
-                                    try:
-                                        setattr(l_nvt_object, l_nvt_tag, l_nvt_text)
-                                    except (TypeError, ValueError) as e:
-                                        logging.warning(
-                                            "%s value is not a valid NVT value for %s property in %s vulnerability. skipping vulnerability..."
-                                            % (l_nvt_text, l_nvt_tag, l_vid)
-                                        )
-                                        logging.debug(e)
-                                    continue
-
-                        # For filter tags without content, like: <cert/>
-                        else:
-                            try:
-                                setattr(l_nvt_object, l_nvt_tag, "")
-                            except (TypeError, ValueError) as e:
-                                logging.warning(
-                                    "Empty value is not a valid NVT value for %s property in %s vulnerability. skipping vulnerability..."
-                                    % (l_nvt_tag, l_vid)
-                                )
-                                logging.debug(e)
-                                continue
-
-                # Get CVSS
-                cvss_candidate = l_val.find("tags")
-                if cvss_candidate is not None and getattr(cvss_candidate, "text", None):
-                    # Extract data
-                    cvss_tmp = cvss_regex.search(cvss_candidate.text)
-                    if cvss_tmp:
-                        l_nvt_object.cvss_base_vector = (
-                            cvss_tmp.group(2) if len(cvss_tmp.groups()) >= 2 else ""
-                        )
-
-                # Add to the NVT Object
-                try:
-                    l_partial_result.nvt = l_nvt_object
-                except (TypeError, ValueError) as e:
-                    logging.warning(
-                        "NVT oid %s is not a valid NVT value for %s vulnerability. skipping vulnerability..."
-                        % (l_nvt_object.oid, l_vid)
-                    )
-                    logging.debug(e)
-                    continue
-
-            # --------------------------------------------------------------------------
-            # Severity
-            # --------------------------------------------------------------------------
-            elif l_tag == "severity":
-                try:
-                    l_severity = l_val.text
-                    l_partial_result.severity = l_severity
-                except TypeError as e:
-                    logging.warning("%s is not a valid severity, skipping vulnerability..." % l_severity)
-                    logging.debug(e)
-                    continue
-
-            # --------------------------------------------------------------------------
-            # Name
-            # --------------------------------------------------------------------------
-            elif l_tag == "name":
-                try:
-                    l_name = l_val.text
-                    l_partial_result.name = l_name
-                except TypeError as e:
-                    logging.warning("%s is not a valid vulnerability ID, skipping vulnerability..." % l_name)
-                    logging.debug(e)
+        # --------------------------------------------------------------------------
+        # Port
+        # --------------------------------------------------------------------------
+        elif l_tag == "port":
+            l_port = _parse_port(l_val.text or "")
+            if l_port is None:
+                logging.warning(
+                    "%s is not a valid port for %s vulnerability. skipping vulnerability..."
+                    % (l_val.text, l_vid)
+                )
                 continue
+            l_values["port"] = l_port
+
+        # --------------------------------------------------------------------------
+        # NVT
+        # --------------------------------------------------------------------------
+        elif l_tag == "nvt":
+            l_values["nvt"] = _parse_nvt(l_val, l_vid)
+
+        # --------------------------------------------------------------------------
+        # Unknown tags
+        # --------------------------------------------------------------------------
+        else:
+            # Unrecognised tag
+            logging.debug("%s tag unrecognised" % l_tag)
+
+    return OpenVASResult._make(**l_values)
+
+
+def _parse_port(text):
+    """
+	Transform a port text of an OpenVAS report into OpenVASPort object.
+
+	:param text: port text, like "https (443/tcp)" or "general/tcp".
+	:type text: str
+
+	:return: OpenVASPort structure, or None if the port is invalid.
+	:rtype: OpenVASPort | None
+	"""
+
+    # Looking for port as format: https (443/tcp)
+    l_port = _PORT_REGEX_SPECIFIC.search(text)
+    if l_port:
+        l_number = int(l_port.group(2))
+        if l_number and not (0 < l_number < 65535):
+            return None
+        return OpenVASPort._make(l_port.group(1), l_number, l_port.group(3))
+
+    # Looking for port as format: general/tcp
+    l_port = _PORT_REGEX_GENERIC.search(text)
+    if l_port:
+        return OpenVASPort._make(l_port.group(1), 0, l_port.group(2))
+
+    return None
+
+
+def _parse_nvt(l_val, l_vid):
+    """
+	Transform a <nvt> element of an OpenVAS report into OpenVASNVT object.
+
+	:param l_val: <nvt> element to parse.
+	:type l_val: Element
+
+	:param l_vid: ID of the vulnerability which the NVT belongs to.
+	:type l_vid: str
 
-            # --------------------------------------------------------------------------
-            # Unknown tags
-            # --------------------------------------------------------------------------
+	:return: OpenVASNVT structure.
+	:rtype: OpenVASNVT
+	"""
+    l_values = {"oid": l_val.attrib["oid"]}
+
+    # Sub nodes of NVT tag
+    for l_nvt in l_val:
+        l_nvt_tag = l_nvt.tag
+
+        if l_nvt_tag not in _NVT_TAGS:
+            continue
+
+        # For filter tags like <cve>NOCVE</cve> and tags without content, like: <cert/>
+        l_nvt_text = l_nvt.text
+        if not l_nvt_text or l_nvt_text.startswith("NO"):
+            l_nvt_text = ""
+
+        # --------------------------------------------------------------------------
+        # Vulnerability IDs: CVE-..., BID..., BugTraq..., and other list values
+        # --------------------------------------------------------------------------
+        if l_nvt_tag in _NVT_LIST_TAGS:
+            if not l_nvt_text:
+                continue
+            l_list = l_values.setdefault(l_nvt_tag, [])
+            if l_nvt_tag.lower() in _VULNERABILITY_IDS:
+                l_list.extend([x.strip() for x in l_nvt_text.split(",")])
             else:
-                # Unrecognised tag
-                logging.debug("%s tag unrecognised" % l_tag)
+                l_list.append(l_nvt_text)
 
-        # Add to the return values
-        m_return_append(l_partial_result)
+        elif l_nvt_tag == "cvss_base":
+            try:
+                l_cvss_base = float(l_nvt_text) if l_nvt_text else 0.0
+                if not (0.0 <= l_cvss_base <= 10.0):
+                    raise ValueError("CVSS value must be between 0.0 - 10.0, got %s instead" % l_cvss_base)
+            except ValueError as e:
+                logging.warning(
+                    "%s value is not a valid NVT value for %s property in %s vulnerability. skipping vulnerability..."
+                    % (l_nvt_text, l_nvt_tag, l_vid)
+                )
+                logging.debug(e)
+                continue
+            l_values["cvss_base"] = l_cvss_base
 
-    return m_return
+        elif l_nvt_tag == "risk_factor":
+            if l_nvt_text not in OpenVASNVT.risk_levels:
+                logging.warning(
+                    "%s value is not a valid NVT value for %s property in %s vulnerability. skipping vulnerability..."
+                    % (l_nvt_text, l_nvt_tag, l_vid)
+                )
+                continue
+            l_values["risk_factor"] = l_nvt_text
+
+        else:
+            l_values[l_nvt_tag] = l_nvt_text
+
+    # Get CVSS
+    cvss_candidate = l_val.find("tags")
+    if cvss_candidate is not None and getattr(cvss_candidate, "text", None):
+        # Extract data
+        cvss_tmp = _CVSS_REGEX.search(cvss_candidate.text)
+        if cvss_tmp:
+            l_values["cvss_base_vector"] = cvss_tmp.group(2) if len(cvss_tmp.groups()) >= 2 else ""
+
+    return OpenVASNVT._make(**l_values)
 
 
 # ------------------------------------------------------------------------------
@@ -683,6 +714,8 @@ class VulnscanManager(object):
 
         try:
             port_list_id = self.get_port_lists().get(port_list_name).get("id")
+        except ConnectionLostError:
+            raise
         except:
             port_list_id = None
         # Create the target
@@ -690,6 +723,8 @@ class VulnscanManager(object):
             m_target_id = self.__manager.create_target(
                 m_target_name, target, "Temporal target from OpenVAS Lib", port_list_id, alive_test
             )
+        except ConnectionLostError:
+            raise
         except ServerError as e:
             raise VulnscanTargetError("The target already exits on the server. Error: %s" % e.message)
 
@@ -697,6 +732,8 @@ class VulnscanManager(object):
         try:
             tmp = self.__manager.get_configs_ids(profile)
             m_profile_id = tmp[profile]
+        except ConnectionLostError:
+            raise
         except ServerError as e:
             raise VulnscanProfileError("The profile select not exits int the server. Error: %s" % e.message)
         except KeyError:
@@ -713,6 +750,8 @@ class VulnscanManager(object):
                 schedule=schedule,
                 comment=comment,
             )
+        except ConnectionLostError:
+            raise
         except ServerError as e:
             raise VulnscanScanError("The target selected doesnn't exist in the server. Error: %s" % e.message)
 
@@ -720,6 +759,8 @@ class VulnscanManager(object):
         try:
             m_task_start_response = self.__manager.start_task(m_task_id)
             self.__task_report_id = m_task_start_response.find("report_id").text
+        except ConnectionLostError:
+            raise
         except ServerError as e:
             raise VulnscanScanError(
                 "Unknown error while try to start the task '%s'. Error: %s" % (m_task_id, e.message)
@@ -752,6 +793,41 @@ class VulnscanManager(object):
 		"""
         return self.__target_id
 
+    # ----------------------------------------------------------------------
+    @property
+    def last_response_stats(self):
+        """
+		:returns: Bytes received, elapsed time and parse time (in seconds) of the last response.
+		:rtype: dict
+		"""
+        return self.__manager.last_response_stats
+
+    # ----------------------------------------------------------------------
+    def is_alive(self):
+        """
+		Check whether the authenticated connection can be reused.
+
+		:rtype: bool
+		"""
+        return self.__manager.is_alive()
+
+    # ----------------------------------------------------------------------
+    def set_timeout(self, timeout):
+        """
+		Set the timeout of each socket operation of the following requests.
+
+		:param timeout: timeout in seconds.
+		:type timeout: int
+		"""
+        self.__manager.set_timeout(timeout)
+
+    # ----------------------------------------------------------------------
+    def close(self):
+        """
+		Close the connection to the OpenVAS server.
+		"""
+        self.__manager.close()
+
     # ----------------------------------------------------------------------
     def create_user(self, name, password, role="user"):
         """
@@ -1041,12 +1117,12 @@ class VulnscanManager(object):
         # ----------------------------------------------------------------------
 
     # ----------------------------------------------------------------------
-    def get_report_xml(self, report_id):
+    def get_report_xml(self, report_id, output=None):
 
         if not isinstance(report_id, str):
             raise TypeError("Expected string, got %r instead" % type(report_id))
 
-        return self.__manager.get_report_xml(report_id)
+        return self.__manager.get_report_xml(report_id, output)
         # ----------------------------------------------------------------------
 
     # ----------------------------------------------------------------------
@@ -7,8 +7,10 @@ This file contains interfaces for OMP implementations
 """
 
 import logging
+import select
 import socket
 import ssl
+import time
 from threading import RLock
 
 try:
@@ -106,6 +108,7 @@ class ConnectionManager(object):
 	"""
 
     TIMEOUT = 10.0
+    RECV_BUFFER_SIZE = 64 * 1024
 
     # ----------------------------------------------------------------------
     def __init__(self, host, username, password, port=9390, timeout=None, ssl_verify=False):
@@ -160,6 +163,9 @@ class ConnectionManager(object):
         self.__socket_lock = RLock()
         self.socket = None
 
+        # Statistics of the last response, see `last_response_stats`
+        self.__last_response_stats = {"bytes": 0, "elapsed": 0.0, "parse_time": 0.0}
+
         # Make the connection
         self._connect()
 
@@ -271,15 +277,22 @@ class ConnectionManager(object):
             return v
 
     # ----------------------------------------------------------------------
-    def _send(self, in_data):
+    def _send(self, in_data, output=None):
         """Send OMP data to the manager and read the result.
 
 		`in_data` may be either an unicode string, an utf-8 encoded
 		string or an etree Element. The result is as an etree Element.
 
+		If `output` is given, the raw response is written to it and the
+		parsed elements are discarded, so the result is the root element
+		with its attributes only.
+
 		:param in_data: data to send.
 		:type in_data: str | ElementTree
 
+		:param output: binary file object to write the raw response.
+		:type output: file
+
 		:return: XML tree element.
 		:rtype: `ElementTree`
 
@@ -305,33 +318,59 @@ class ConnectionManager(object):
             try:
                 self.socket.sendall(in_data)
             except socket.error:
-                raise ServerError("Can't connect to the server.")
+                raise ConnectionLostError("Can't connect to the server.")
 
             # Get the response from the server.
+            # Chunks are fed to an incremental parser so that the whole response is parsed
+            # only once, and the end of the response is detected by the end of the root element.
             tree = None
-            data = []
+            root = None
+            elements = []
+            parser = etree.XMLPullParser(events=("start", "end"))
+            received = 0
+            parse_time = 0.0
+            started_at = time.time()
             try:
-                while True:
-                    chunk = self.socket.recv(1024)
+                while tree is None:
+                    chunk = self.socket.recv(ConnectionManager.RECV_BUFFER_SIZE)
                     if not chunk:
-                        break
-                    data.append(chunk)
+                        raise ConnectionLostError("Connection closed by the server.")
+                    received += len(chunk)
+                    if output is not None:
+                        output.write(chunk)
 
-                    # We use this tip for avoid socket blocking:
-                    # If xml is correct, we're finished to receive info. Otherwise,
-                    # continue receiving
+                    parse_started_at = time.time()
                     try:
-                        tree = etree.fromstring(b"".join(data))
-                    except Exception:
-                        continue
-                    break
+                        parser.feed(chunk)
+                        for event, element in parser.read_events():
+                            if event == "start":
+                                if root is None:
+                                    root = element
+                                if output is not None:
+                                    elements.append(element)
+                            elif element is root:
+                                tree = root
+                                break
+                            elif output is not None:
+                                # The response is kept in `output`, so discard the parsed element
+                                elements.pop()
+                                del elements[-1][-1]
+                    except etree.ParseError as e:
+                        raise ServerError("Invalid XML response from the server: %s" % e)
+                    finally:
+                        parse_time += time.time() - parse_started_at
             except socket.error as e:
-                raise ServerError("Can't receive info from the server: %s" % e)
-
-            # if tree is None:
-            if tree is None:
-                tree = etree.ElementTree()
-                return tree
+                raise ConnectionLostError("Can't receive info from the server: %s" % e)
+
+            self.__last_response_stats = {
+                "bytes": received,
+                "elapsed": time.time() - started_at,
+                "parse_time": parse_time,
+            }
+            logging.debug(
+                "Received %d bytes in %.3f sec (parse %.3f sec)"
+                % (received, self.__last_response_stats["elapsed"], parse_time)
+            )
 
             # Return the parsed response.
             return tree
@@ -358,7 +397,48 @@ class ConnectionManager(object):
             self.socket = None
 
     # ----------------------------------------------------------------------
-    def make_xml_request(self, xmldata, xml_result=False):
+    def is_alive(self):
+        """
+		Check whether the connection is still usable, without sending any request.
+
+		No response is outstanding while the socket lock is held, so a readable
+		socket means the server has closed the connection.
+
+		:return: True if the connection can be reused.
+		:rtype: bool
+		"""
+        if self.__host == "dummy":
+            return True
+
+        with self.__socket_lock:
+            if self.socket is None:
+                return False
+            try:
+                if isinstance(self.socket, ssl.SSLSocket) and self.socket.pending() > 0:
+                    return False
+                readable, _, _ = select.select([self.socket], [], [], 0)
+            except (socket.error, ValueError):
+                return False
+            return not readable
+
+    # ----------------------------------------------------------------------
+    def set_timeout(self, timeout):
+        """
+		Set the timeout of each socket operation of the following requests.
+
+		:param timeout: timeout in seconds.
+		:type timeout: int
+		"""
+        if self.__host == "dummy":
+            return
+
+        with self.__socket_lock:
+            self.__timeout = timeout
+            if self.socket is not None:
+                self.socket.settimeout(timeout)
+
+    # ----------------------------------------------------------------------
+    def make_xml_request(self, xmldata, xml_result=False, output=None):
         """
 		Low-level interface to send OMP XML to the manager.
 
@@ -372,6 +452,9 @@ class ConnectionManager(object):
 		:param xml_result: boolean that indicates if the response will be in XML format.
 		:type xml_result: bool
 
+		:param output: binary file object to stream the raw response into, instead of keeping it in the result.
+		:type output: file
+
 		:return: a text/xml data from the server.
 		:rtype: `ElementTree`|str
 
@@ -383,7 +466,7 @@ class ConnectionManager(object):
             raise TypeError("Expected bool, got '%s' instead" % type(xml_result))
 
         # logging.debug("XMLDATA: " + str(xmldata))
-        response = self._send(xmldata)
+        response = self._send(xmldata, output)
         # logging.debug("RESPONSE: " + etree.tostring(response))
 
         # Check the response
@@ -424,6 +507,15 @@ class ConnectionManager(object):
 		"""
         return self.__version
 
+    # ----------------------------------------------------------------------
+    @property
+    def last_response_stats(self):
+        """
+		:return: Get bytes received, elapsed time and parse time (in seconds) of the last response.
+		:rtype: dict
+		"""
+        return self.__last_response_stats
+
 
 #
 #
@@ -465,6 +557,10 @@ class ServerError(_ErrorResponse):
     """error occurred in the manager during the processing of this command"""
 
 
+class ConnectionLostError(ServerError):
+    """connection to the manager was closed or broken before the whole response was received"""
+
+
 class ResultError(Error):
     """Get invalid answer from Server"""
 
@@ -823,5 +919,40 @@ class OMP(object):
 		"""
         return self._manager.protocol_version
 
+    # ----------------------------------------------------------------------
+    @property
+    def last_response_stats(self):
+        """
+		Get statistics of the last response from the server
+
+		:return: bytes received, elapsed time and parse time (in seconds)
+		:rtype: dict
+		"""
+        return self._manager.last_response_stats
+
+    # ----------------------------------------------------------------------
+    def is_alive(self):
+        """
+		Check whether the connection to the server is still usable.
+
+		:rtype: bool
+		"""
+        return self._manager.is_alive()
+
+    # ----------------------------------------------------------------------
+    def set_timeout(self, timeout):
+        """
+		Set the timeout of each socket operation of the following requests.
+
+		:param timeout: timeout in seconds.
+		:type timeout: int
+		"""
+        self._manager.set_timeout(timeout)
+
+    # ----------------------------------------------------------------------
+    def close(self):
+        """Close the connection to the server."""
+        self._manager.close()
+
 
 # __all__ = [m for m in globals() if m.endswith("Error")]
@@ -46,6 +46,8 @@ else:
 
 # ------------------------------------------------------------------------------
 class _Common(object):
+    __slots__ = ()
+
     risk_levels = ("Critical", "High", "Medium", "Low", "None", "None", "Log", "Debug")
 
 
@@ -55,6 +57,8 @@ class OpenVASPort(object):
     Port definition.
     """
 
+    __slots__ = ("__port_name", "__number", "__proto")
+
     # ----------------------------------------------------------------------
     def __init__(self, port_name, number, proto):
         """
@@ -84,6 +88,20 @@ class OpenVASPort(object):
         self.__number = number
         self.__proto = proto.strip()
 
+    # ----------------------------------------------------------------------
+    @classmethod
+    def _make(cls, port_name, number, proto):
+        """
+        Make a port from trusted values, i.e. parser output, without validation.
+
+        :rtype: OpenVASPort
+        """
+        self = cls.__new__(cls)
+        self.__port_name = port_name.strip()
+        self.__number = number
+        self.__proto = proto.strip()
+        return self
+
     # ----------------------------------------------------------------------
     @property
     def proto(self):
@@ -122,6 +140,24 @@ class OpenVASNVT(_Common):
     OpenVas NVT structure.
     """
 
+    __slots__ = (
+        "__oid",
+        "__name",
+        "__cvss_base",
+        "__cvss_base_vector",
+        "__risk_factor",
+        "__category",
+        "__summary",
+        "__description",
+        "__family",
+        "__cves",
+        "__bids",
+        "__bugtraqs",
+        "__xrefs",
+        "__fingerprints",
+        "__tags",
+    )
+
     # ----------------------------------------------------------------------
     def __init__(self):
         self.__oid = None
@@ -143,6 +179,49 @@ class OpenVASNVT(_Common):
 
         super(OpenVASNVT, self).__init__()
 
+    # ----------------------------------------------------------------------
+    @classmethod
+    def _make(
+        cls,
+        oid,
+        name="",
+        cvss_base=0.0,
+        cvss_base_vector=None,
+        risk_factor="None",
+        category="Unknown",
+        summary="",
+        description="",
+        family="Unknown",
+        cve=None,
+        bid=None,
+        bugtraq=None,
+        xrefs=None,
+        fingerprints="",
+        tags=None,
+    ):
+        """
+        Make a NVT from trusted values, i.e. parser output, without validation.
+
+        :rtype: OpenVASNVT
+        """
+        self = cls.__new__(cls)
+        self.__oid = oid
+        self.__name = name
+        self.__cvss_base = cvss_base
+        self.__cvss_base_vector = cvss_base_vector
+        self.__risk_factor = risk_factor
+        self.__category = category
+        self.__summary = summary
+        self.__description = description
+        self.__family = family
+        self.__cves = cve if cve is not None else []
+        self.__bids = bid if bid is not None else []
+        self.__bugtraqs = bugtraq if bugtraq is not None else []
+        self.__xrefs = xrefs if xrefs is not None else []
+        self.__fingerprints = fingerprints
+        self.__tags = tags if tags is not None else []
+        return self
+
     # ----------------------------------------------------------------------
     @property
     def oid(self):
@@ -728,6 +807,26 @@ class OpenVASResult(_Common):
     Main structure to store audit results.
     """
 
+    __slots__ = (
+        "__id",
+        "__subnet",
+        "__host",
+        "__port",
+        "__nvt",
+        "__threat",
+        "__description",
+        "__notes",
+        "__overrides",
+        "__severity",
+        "__name",
+        "__impact",
+        "__summary",
+        "__vulnerability_insight",
+        "__affected_software",
+        "__solution",
+        "__description_parsed",
+    )
+
     # ----------------------------------------------------------------------
     def __init__(self):
         self.__id = None
@@ -748,30 +847,75 @@ class OpenVASResult(_Common):
         self.__vulnerability_insight = ""
         self.__affected_software = ""
         self.__solution = ""
+        self.__description_parsed = True
 
         super(OpenVASResult, self).__init__()
 
+    # ----------------------------------------------------------------------
+    @classmethod
+    def _make(
+        cls,
+        id,
+        subnet=None,
+        host=None,
+        port=None,
+        nvt=None,
+        threat=None,
+        raw_description=None,
+        severity=None,
+        name=None,
+    ):
+        """
+        Make a result from trusted values, i.e. parser output, without validation.
+
+        :rtype: OpenVASResult
+        """
+        self = cls.__new__(cls)
+        self.__id = id
+        self.__subnet = subnet
+        self.__host = host
+        self.__port = port
+        self.__nvt = nvt
+        self.__threat = threat
+        self.__description = raw_description if raw_description is not None else ""
+        self.__notes = None
+        self.__overrides = None
+        self.__severity = severity
+        self.__name = name
+        self.__impact = ""
+        self.__summary = ""
+        self.__vulnerability_insight = ""
+        self.__affected_software = ""
+        self.__solution = ""
+        self.__description_parsed = False
+        return self
+
     # --------------------------------------------------------------------------
     # Auto generated read only
     # --------------------------------------------------------------------------
     @property
     def impact(self):
+        self.__parse_description()
         return self.__impact
 
     @property
     def summary(self):
+        self.__parse_description()
         return self.__summary
 
     @property
     def vulnerability_insight(self):
+        self.__parse_description()
         return self.__vulnerability_insight
 
     @property
     def affected_software(self):
+        self.__parse_description()
         return self.__affected_software
 
     @property
     def solution(self):
+        self.__parse_description()
         return self.__solution
 
     # ----------------------------------------------------------------------
@@ -919,6 +1063,25 @@ class OpenVASResult(_Common):
         elif not isinstance(val, str):
             raise TypeError("Expected string, got %r instead" % type(val))
 
+        self.__description = val
+        self.__impact = ""
+        self.__summary = ""
+        self.__vulnerability_insight = ""
+        self.__affected_software = ""
+        self.__solution = ""
+        self.__description_parsed = False
+
+    # ----------------------------------------------------------------------
+    def __parse_description(self):
+        """
+        Split raw description into the auto generated properties, on the first access of them.
+        """
+        if self.__description_parsed:
+            return
+        self.__description_parsed = True
+
+        val = self.__description
+
         # --------------------------------------------------------------------------
         # Get "Solution", "Impact", "Summary" and "Affected Software", "Vulnerability Insight"
         # --------------------------------------------------------------------------
@@ -979,8 +1142,6 @@ class OpenVASResult(_Common):
 
                 setattr(self, "_OpenVASResult__%s" % var_name, text)
 
-        self.__description = val
-
     # ----------------------------------------------------------------------
     @property
     def notes(self):
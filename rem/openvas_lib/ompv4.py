@@ -637,13 +637,13 @@ class OMPv4(OMP):
         return m_response
 
     # ----------------------------------------------------------------------
-    def get_report_xml(self, report_id):
+    def get_report_xml(self, report_id, output=None):
         if not isinstance(report_id, str):
             raise TypeError("Expected string, got %r instead" % type(report_id))
 
         try:
             m_response = self._manager.make_xml_request(
-                '<get_reports report_id="%s" />' % report_id, xml_result=True
+                '<get_reports report_id="%s" />' % report_id, xml_result=True, output=output
             )
         except ServerError as e:
             raise VulnscanServerError(
@@ -990,6 +990,8 @@ class OMPv7(OMP):
             m_response = self._manager.make_xml_request(
                 '<get_tasks task_id="%s" details="1"/>' % task_id, xml_result=True
             )
+        except ConnectionLostError:
+            raise
         except ServerError as e:
             raise VulnscanServerError(
                 "Can't get the detail for the task %s. Error: %s" % (task_id, e.message)
@@ -1155,28 +1157,27 @@ class OMPv7(OMP):
 
     # ----------------------------------------------------------------------
 
-    def get_report_xml(self, report_id):
+    def get_report_xml(self, report_id, output=None):
         """
 		Get the xml associated to the report ID.
 
 		:param report_id: ID of report to get.
 		:type report_id: str
 
+		:param output: binary file object to stream the raw report into.
+		:type output: file
+
 		:return: xml object
 		:rtype: `ElementTree`
 
+		:raises: ClientError, ServerError
 		"""
         if not isinstance(report_id, str):
             raise TypeError("Expected string, got %r instead" % type(report_id))
 
-        try:
-            m_response = self._manager.make_xml_request(
-                '<get_reports report_id="%s" />' % report_id, xml_result=True
-            )
-        except ServerError as e:
-            print(("Can't get the xml for the report %s. Error: %s" % (report_id, e.message)))
-
-        return m_response
+        return self._manager.make_xml_request(
+            '<get_reports report_id="%s" />' % report_id, xml_result=True, output=output
+        )
 
     # ----------------------------------------------------------------------
 
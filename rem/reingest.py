@@ -0,0 +1,23 @@
+import argparse
+
+from app import app
+from core import ReportReingester
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reload scan results from archived raw reports")
+    parser.add_argument(
+        "scan_ids", metavar="SCAN_ID", type=int, nargs="*", help="scans to reingest (all if omitted)"
+    )
+    parser.add_argument("--workers", type=int, default=None, help="number of processes parsing reports")
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.workers is None:
+            ReportReingester().run(args.scan_ids)
+        else:
+            ReportReingester(args.workers).run(args.scan_ids)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Check that occurrences of the vulnerability catalog count results attached to a live scan.
+
+Run against a migrated MySQL database with the usual DB_* environment variables:
+
+    pipenv run test
+"""
+import unittest
+import uuid
+
+from flask_jwt_extended import create_access_token
+
+from app import app
+from core import AuditTable
+from core import ResultTable
+from core import ScanTable
+from core import StoppedTask
+from core import VulnTable
+from core import db
+
+
+class OccurrencesTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        self.oid = "1.3.6.1.4.1.25623.1.0.test." + uuid.uuid4().hex[:8]
+        audit_uuid = uuid.uuid4().hex[:24] + "0" * 8
+
+        with app.app_context():
+            self.token = create_access_token(identity={"scope": "*", "restricted": False})
+            self.audit = AuditTable.create(uuid=audit_uuid, name="occurrences test")
+            self.scans = [
+                ScanTable.create(
+                    uuid=audit_uuid[:24] + uuid.uuid4().hex[:8], audit_id=self.audit.id, target="t"
+                )
+                for _ in range(2)
+            ]
+
+    def tearDown(self):
+        with app.app_context():
+            ResultTable.delete().where(ResultTable.oid == self.oid).execute()
+            VulnTable.delete().where(VulnTable.oid == self.oid).execute()
+            AuditTable.delete().where(AuditTable.id == self.audit.id).execute()
+
+    def test_store_restore_and_delete(self):
+        self._store(self.scans[0], 2)
+        self.assertEqual(self._get_occurrences(), 2)
+
+        self._store(self.scans[1], 1)
+        self.assertEqual(self._get_occurrences(), 3)
+
+        # Re-storing a scan replaces its results
+        self._store(self.scans[0], 1)
+        self.assertEqual(self._get_occurrences(), 2)
+
+        res = self.client.delete("/scan/{}/".format(self.scans[0].uuid), headers=self._get_headers())
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self._get_occurrences(), 1)
+
+        res = self.client.delete("/audit/{}/".format(self.audit.uuid), headers=self._get_headers())
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self._get_occurrences(), 0)
+
+    def _store(self, scan, count):
+        result = {
+            "name": "test",
+            "host": "127.0.0.1",
+            "port": "general/tcp",
+            "cvss_base": "0.0",
+            "cve": "",
+            "oid": self.oid,
+            "description": "",
+            "qod": "",
+            "severity": "0.0",
+            "severity_rank": "Log",
+            "scanner": "test",
+        }
+        with app.app_context(), db.database.atomic():
+            StoppedTask.store_report(scan.id, (dict(result) for _ in range(count)))
+
+    def _get_occurrences(self):
+        with app.app_context():
+            return VulnTable.get(VulnTable.oid == self.oid).occurrences
+
+    def _get_headers(self):
+        return {"Authorization": "Bearer " + self.token}
+
+
+if __name__ == "__main__":
+    unittest.main()